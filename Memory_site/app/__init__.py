@@ -28,6 +28,23 @@ def create_app(config_class=Config):
     from .admin.routes import admin_bp
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
+    from .api.routes import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Request timing, structured timing log and /metrics
+    from . import metrics
+    metrics.init_app(app)
+
+    # Summarization model and model server settings
+    from .services import ai_summarizer, summarizer_backends
+    ai_summarizer.init_app(app)
+    summarizer_backends.init_app(app)
+
+    # Card rendering and thumbnail settings
+    from .services import model_generator, thumbnails
+    model_generator.init_app(app)
+    thumbnails.init_app(app)
+
     # Import models here to avoid circular imports
     from . import models
 
@@ -1,20 +1,20 @@
 import os
 import re
-import fitz  # PyMuPDF
 from bson.objectid import ObjectId
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, Response, session
 from flask_login import login_required, current_user
 from app import mongo
-# Import both of your services
-from app.services.ai_summarizer import summarize_text_with_bart
-from app.services.model_generator import create_text_texture, generate_3d_card
-# Import the Google Drive service
-from app.services.google_drive import upload_to_drive
-from pptx import Presentation
+from app.services.job_queue import ALLOWED_EXTENSIONS, enqueue_upload_job, get_job_status
 
-from flask import send_file
-# Ensure you import the new function
-from app.services.google_drive import stream_file
+from werkzeug.datastructures import ContentRange
+from googleapiclient.errors import HttpError
+from app.services.google_drive import get_file_metadata, iter_file_chunks
+from app.services.model_cache import get_model_cache, range_not_satisfiable, is_safe_id
+from app.services.storage import get_storage, is_storage_key, drive_location
+from app.services.asset_queries import list_assets, college_fields, coordinate_point, OTHER_SEMESTER
+from app.services.facets import get_facets, semester_counts, invalidate_facets
+from app.services.manifest import reserve_versions
+from app.metrics import timed_query, log_event
 
 
 
@@ -39,6 +39,10 @@ def validate_college_data(name, coord):
     # Regex: float,float (e.g. 11.11,22.22)
     if not re.match(r"^-?\d+(\.\d+)?,-?\d+(\.\d+)?$", coord):
         return False, "Invalid Coordinates: Use 'float,float' format (e.g. 11.83,12.43)."
+
+    # Stored as a GeoJSON point too, so it has to be a real latitude,longitude
+    if coordinate_point(coord) is None:
+        return False, "Invalid Coordinates: Latitude must be within ±90 and longitude within ±180."
     
     return True, ""
 
@@ -69,7 +73,9 @@ def add_new_college():
         return redirect(url_for('admin.add_new'))
 
     try:
-        mongo.db.colleges.insert_one({'college_name': name, 'coordinate': coord})
+        mongo.db.colleges.insert_one({'college_name': name, 'coordinate': coord,
+                                      **college_fields(coord)})
+        invalidate_facets(mongo.db)
         flash(f'College "{name}" added successfully!', 'success')
     except Exception as e:
         flash(f'Error: {e}', 'error')
@@ -88,10 +94,14 @@ def edit_college(college_id):
         return redirect(url_for('admin.add_new'))
 
     try:
-        mongo.db.colleges.update_one(
-            {'_id': ObjectId(college_id)},
-            {'$set': {'college_name': name, 'coordinate': coord}}
-        )
+        with reserve_versions(mongo.db) as version:
+            mongo.db.colleges.update_one(
+                {'_id': ObjectId(college_id)},
+                {'$set': {'college_name': name, 'coordinate': coord, **college_fields(coord),
+                          # AR clients synced before this edit must fetch a full manifest
+                          'manifest_reset': version}}
+            )
+        invalidate_facets(mongo.db)
         flash('College updated successfully!', 'success')
     except Exception as e:
         flash(f'Update failed: {e}', 'error')
@@ -103,6 +113,7 @@ def edit_college(college_id):
 def delete_college(college_id):
     try:
         mongo.db.colleges.delete_one({'_id': ObjectId(college_id)})
+        invalidate_facets(mongo.db)
         flash('College deleted successfully!', 'success')
     except Exception as e:
         flash(f'Delete failed: {e}', 'error')
@@ -111,8 +122,8 @@ def delete_college(college_id):
 @admin_bp.route('/generator')
 @login_required
 def generator():
-    summary = session.pop('summary', None)
-    glb_path = session.pop('glb_path', None)
+    # The upload redirects here with ?job=<id>; the page polls the job status
+    job_id = request.args.get('job')
 
     college_data = {}
     try:
@@ -124,134 +135,72 @@ def generator():
 
     except Exception as e:
         flash("Could not connect to the database to fetch college data.")
-        print(f"Error fetching college data: {e}")
+        log_event('mongo_error', view='generator', error=str(e))
 
     return render_template('admin/generator.html',
-                           summary=summary,
-                           glb_path=glb_path,
+                           job_id=job_id,
                            college_data=college_data)
 
-@admin_bp.route('/materials')
-@login_required
-def materials():
+def _library_page(template, projection, error_label):
+    """
+    Shared body of the materials/models views: one semester of one college,
+    optionally one branch, fetched a page at a time with an indexed query.
+    Without a college in the URL, the last one picked (or the first college)
+    is shown instead of an empty page.
+    """
+    college = request.args.get('college') or None
+    branch = request.args.get('branch') or None
+    if branch == 'All':
+        branch = None
+    semester = request.args.get('sem', '1')
+    semester = OTHER_SEMESTER if semester == 'other' else int(semester) if semester.isdigit() else 1
+    after = request.args.get('after') or None
+
+    assets, next_after = [], None
+    college_names, branch_names, sem_counts = [], [], {}
     try:
-        # 1. Fetch Colleges
-        colleges = list(mongo.db.colleges.find({}, {'college_name': 1, 'coordinate': 1}))
-        
-        def clean_coord(c): return str(c).replace(" ", "").strip().lower() if c else ""
-
-        coord_to_college = {}
-        for c in colleges:
-            if c.get('coordinate'):
-                coord_to_college[clean_coord(c.get('coordinate'))] = c.get('college_name')
-        
-        college_names = sorted(list(set(c['college_name'] for c in colleges if 'college_name' in c)))
-
-        # 2. Fetch Assets
-        assets_cursor = mongo.db.assets.find({}, {
-            'filename': 1, 
-            'pdf_url': 1,
-            'semester': 1, 
-            'coordinate': 1,
-            'branch': 1
-        })
-        assets = list(assets_cursor)
-
-        # Extract unique branches for the dropdown
-        branch_names = sorted(list(set(str(a.get('branch', '')).strip() for a in assets if a.get('branch'))))
-
-        # 3. Group by Semester
-        materials_by_sem = {str(i): [] for i in range(1, 9)}
-        materials_by_sem['Other'] = []
-
-        for asset in assets:
-            raw_coord = asset.get('coordinate')
-            asset['college_name'] = coord_to_college.get(clean_coord(raw_coord), 'Unknown')
-
-            raw_sem = str(asset.get('semester', ''))
-            match = re.search(r'(\d+)', raw_sem)
-            
-            target_bucket = 'Other'
-            if match:
-                sem_num = int(match.group(1))
-                if 1 <= sem_num <= 8:
-                    target_bucket = str(sem_num)
-            
-            materials_by_sem[target_bucket].append(asset)
-
+        with timed_query(error_label, 'facets'):
+            facets = get_facets(mongo.db)
+        college_names = facets['college_names']
+        branch_names = facets['branch_names']
+        if college is None and college_names:
+            remembered = session.get('library_college')
+            college = remembered if remembered in college_names else college_names[0]
+        if college:
+            session['library_college'] = college
+            sem_counts = semester_counts(facets, college, branch)
+            with timed_query(error_label, 'list_assets'):
+                assets, next_after = list_assets(mongo.db, projection, college=college, branch=branch,
+                                                 semester=semester, after=after,
+                                                 limit=current_app.config['ASSETS_PAGE_SIZE'])
     except Exception as e:
-        print(f"Error fetching materials: {e}")
-        materials_by_sem = {str(i): [] for i in range(1, 9)}
-        materials_by_sem['Other'] = []
-        college_names = []
-        branch_names = []
-        
-    return render_template('admin/materials.html', 
-                           materials_by_sem=materials_by_sem, 
+        log_event('mongo_error', view=error_label, error=str(e))
+
+    return render_template(template,
+                           assets=assets,
+                           next_after=next_after,
                            colleges=college_names,
-                           branches=branch_names)
+                           branches=branch_names,
+                           selected_college=college,
+                           selected_branch=branch or 'All',
+                           semester=semester,
+                           semester_counts=sem_counts)
 
 
-@admin_bp.route('/models')
+@admin_bp.route('/materials')
 @login_required
-def models():
-    try:
-        # 1. Fetch Colleges
-        colleges = list(mongo.db.colleges.find({}, {'college_name': 1, 'coordinate': 1}))
-        
-        def clean_coord(c): return str(c).replace(" ", "").strip().lower() if c else ""
+def materials():
+    return _library_page('admin/materials.html',
+                         {'filename': 1, 'pdf_key': 1, 'pdf_url': 1, 'branch': 1, 'thumbnail_key': 1},
+                         'materials')
 
-        coord_to_college = {}
-        for c in colleges:
-            if c.get('coordinate'):
-                coord_to_college[clean_coord(c.get('coordinate'))] = c.get('college_name')
-        
-        college_names = sorted(list(set(c['college_name'] for c in colleges if 'college_name' in c)))
-
-        # 2. Fetch Assets
-        assets_cursor = mongo.db.assets.find({}, {
-            'filename': 1, 
-            'glb_url': 1,
-            'glb_id': 1,
-            'semester': 1, 
-            'coordinate': 1,
-            'branch': 1
-        })
-        assets = list(assets_cursor)
-
-        # Extract unique branches for the dropdown
-        branch_names = sorted(list(set(str(a.get('branch', '')).strip() for a in assets if a.get('branch'))))
-
-        # 3. Group by Semester
-        models_by_sem = {str(i): [] for i in range(1, 9)}
-        models_by_sem['Other'] = []
-
-        for asset in assets:
-            raw_coord = asset.get('coordinate')
-            asset['college_name'] = coord_to_college.get(clean_coord(raw_coord), 'Unknown')
-
-            raw_sem = str(asset.get('semester', ''))
-            match = re.search(r'(\d+)', raw_sem)
-            
-            target_bucket = 'Other'
-            if match:
-                sem_num = int(match.group(1))
-                if 1 <= sem_num <= 8:
-                    target_bucket = str(sem_num)
-            
-            models_by_sem[target_bucket].append(asset)
 
-    except Exception as e:
-        print(f"Error fetching models: {e}")
-        models_by_sem = {str(i): [] for i in range(1, 9)}
-        models_by_sem['Other'] = []
-        college_names = []
-        branch_names = []
-        
-    return render_template('admin/models.html', 
-                           models_by_sem=models_by_sem, 
-                           colleges=college_names,
-                           branches=branch_names)
+@admin_bp.route('/models')
+@login_required
+def models():
+    return _library_page('admin/models.html',
+                         {'filename': 1, 'glb_key': 1, 'glb_url': 1, 'glb_id': 1, 'branch': 1},
+                         'models')
 
 @admin_bp.route('/upload', methods=['POST'])
 @login_required
@@ -264,7 +213,6 @@ def upload_file():
         flash('No files selected!', 'error')
         return redirect(url_for('admin.generator'))
 
-    ALLOWED_EXTENSIONS = {'.pdf', '.ppt', '.pptx'}
     coordinate = request.form.get("coordinate")
     semester = request.form.get("semester")
     branch = request.form.get("branch")
@@ -273,78 +221,34 @@ def upload_file():
         flash('Coordinate is required for asset upload!', 'error')
         return redirect(url_for('admin.generator'))
 
+    # Server-side validation check, before anything is queued
     for file in uploaded_files:
         file_ext = os.path.splitext(file.filename)[1].lower()
-        
-        # Server-side validation check
         if file_ext not in ALLOWED_EXTENSIONS:
             flash(f"Error: '{file.filename}' is not a supported format. Only PDF and PPT are allowed.", 'error')
             return redirect(url_for('admin.generator'))
 
-        try:
-            # Setup directories and paths
-            temp_dir = 'temp'
-            models_dir = os.path.join('app', 'static', 'models')
-            os.makedirs(temp_dir, exist_ok=True)
-            os.makedirs(models_dir, exist_ok=True)
-
-            file_basename = os.path.splitext(file.filename)[0]
-            glb_filename = f"{file_basename}.glb"
-            temp_file_path = os.path.join(temp_dir, file.filename)
-            texture_path = os.path.join(temp_dir, 'summary_texture.png')
-            glb_save_path = os.path.join(models_dir, glb_filename)
-
-            file.save(temp_file_path) 
-            
-            # Text Extraction
-            full_text = ""
-            if file_ext == '.pdf':
-                doc = fitz.open(temp_file_path)
-                full_text = "".join(page.get_text() for page in doc)
-                doc.close()
-            else:
-                prs = Presentation(temp_file_path)
-                text_runs = [shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text")]
-                full_text = "\n".join(text_runs)
-
-            if not full_text.strip():
-                flash(f"Could not extract text from {file.filename}.", 'error')
-                continue
-
-            # Process AI summary and GLB
-            summary = summarize_text_with_bart(full_text)
-            session['summary'] = summary
-            create_text_texture(summary, texture_path)
-            generate_3d_card(texture_path, glb_save_path)
-            session['glb_path'] = f'models/{glb_filename}'
-
-            # Drive Upload and DB Save
-            pdf_drive_url, pdf_drive_id = upload_to_drive(temp_file_path, file.filename, "application/pdf")
-            glb_drive_url, glb_drive_id = upload_to_drive(glb_save_path, glb_filename, "model/gltf-binary")
-
-            mongo.db.assets.insert_one({
-                "filename": file.filename,
-                "pdf_url": pdf_drive_url, 
-                "glb_url": glb_drive_url, 
-                "pdf_id": pdf_drive_id,   
-                "glb_id": glb_drive_id,   
-                "coordinate": coordinate,
-                "semester": semester,
-                "branch": branch
-            })
-
-            flash(f"'{file.filename}' processed successfully!", 'success')
-
-        except Exception as e:
-            flash(f"An error occurred with {file.filename}: {e}", 'error')
-        
-        finally:
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            if 'texture_path' in locals() and os.path.exists(texture_path):
-                os.remove(texture_path)
+    # Heavy processing happens in the worker pool (flask run-workers)
+    try:
+        job_id = enqueue_upload_job(uploaded_files, coordinate, semester, branch,
+                                    current_app.config['JOB_SPOOL_DIR'],
+                                    user_id=current_user.id)
+    except Exception as e:
+        flash(f"Could not queue the upload: {e}", 'error')
+        return redirect(url_for('admin.generator'))
 
-    return redirect(url_for('admin.generator'))
+    flash(f"{len(uploaded_files)} file(s) queued for processing.", 'success')
+    return redirect(url_for('admin.generator', job=job_id))
+
+
+@admin_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """JSON progress of an upload job, polled by the generator page."""
+    status = get_job_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
 
 
 @admin_bp.route('/serve_model/<file_id>')
@@ -352,19 +256,86 @@ def serve_model(file_id):
     """
     Proxy route: Fetches file from Drive and serves it to the browser
     so <model-viewer> doesn't face CORS/Auth issues.
+    Models are cached locally, so repeat views never touch Drive. On a miss
+    the file is streamed chunk by chunk while it is written to the cache.
+    file_id is a storage key or, for older assets, a Drive file id; keys
+    kept on local disk (local/tiered storage) are served from there.
     """
     try:
-        file_stream = stream_file(file_id)
-        
-        if file_stream:
-            return send_file(
-                file_stream,
-                mimetype='model/gltf-binary',
-                as_attachment=False,
-                download_name=f"{file_id}.glb"
-            )
-        else:
-            return "File not found or Drive Error", 404
+        max_age = current_app.config['MODEL_CACHE_MAX_AGE']
+        if is_storage_key(file_id):
+            response = get_storage().send(mongo.db, file_id, max_age)
+            if response is not None:
+                return response
+            location = drive_location(mongo.db, file_id)
+            if location is None:
+                return "File not found", 404
+            file_id = location[0]
+
+        cache = get_model_cache()
+
+        cached = cache.get(file_id)
+        if cached is not None:
+            return cached.send(f"{file_id}.glb", max_age=max_age)
+
+        return stream_model(file_id, cache, max_age)
+    except ValueError:
+        return "File not found", 404
     except Exception as e:
-        print(f"Proxy Error: {e}")
-        return f"Error: {e}", 500
\ No newline at end of file
+        log_event('proxy_error', file_id=file_id, error=str(e))
+        return f"Error: {e}", 500
+
+
+def stream_model(file_id, cache, max_age):
+    """Streams a Drive file straight through to the client, with Range pass-through."""
+    # Checked up front: once the body starts, an error can only truncate the 200
+    if not is_safe_id(file_id):
+        return "Invalid file id", 400
+    try:
+        metadata = get_file_metadata(file_id)
+    except HttpError as e:
+        log_event('proxy_error', file_id=file_id, status=e.resp.status, error=str(e))
+        return "File not found or Drive Error", 404
+
+    size = int(metadata.get('size', 0))
+    etag = metadata.get('md5Checksum')
+    chunk_size = current_app.config['DRIVE_DOWNLOAD_CHUNK_SIZE']
+
+    response = Response(mimetype='model/gltf-binary', direct_passthrough=True)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if etag:
+        response.set_etag(etag)
+        if etag in request.if_none_match:
+            response.status_code = 304
+            return response
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+
+    unsatisfiable = range_not_satisfiable(size)
+    if unsatisfiable is not None:
+        return unsatisfiable
+    byte_range = request.range.range_for_length(size) if request.range else None
+    if byte_range is not None:
+        # Partial request: forward only the requested bytes, don't cache
+        start, stop = byte_range
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, stop, size)
+        response.content_length = stop - start
+        response.response = iter_file_chunks(file_id, start, stop - 1, chunk_size=chunk_size)
+        return response
+
+    def generate():
+        writer = cache.open_writer(file_id, etag=etag)
+        try:
+            for chunk in iter_file_chunks(file_id, chunk_size=chunk_size):
+                writer.write(chunk)
+                yield chunk
+            writer.commit()
+        finally:
+            # Client went away or Drive failed: throw the partial copy away
+            writer.abort()
+
+    response.content_length = size
+    response.response = generate()
+    return response
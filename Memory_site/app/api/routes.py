@@ -0,0 +1,161 @@
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, request, jsonify, url_for, current_app, Response, redirect
+from app import mongo
+from app.metrics import log_event
+from app.services.asset_queries import nearest_college
+from app.services.thumbnails import get_thumbnail
+from app.services.storage import get_storage, is_storage_key, drive_location
+from app.services.manifest import (ASSET_FIELDS, manifest_version, build_manifest, manifest_etag,
+                                   negotiate_encoding, encode_manifest)
+
+# Public, read-only JSON endpoints for the AR app (no login)
+api_bp = Blueprint('api', __name__)
+
+
+def asset_json(asset):
+    # Storage keys first; assets saved before them only have Drive ids and links
+    pdf_key = asset.get('pdf_key')
+    model_id = asset.get('glb_key') or asset.get('glb_id')
+    return {
+        'id': str(asset['_id']),
+        'filename': asset.get('filename'),
+        'semester': asset.get('semester'),
+        'semester_num': asset.get('semester_num'),
+        'branch': asset.get('branch'),
+        'summary': asset.get('summary'),
+        'pdf_url': url_for('api.stored_object', key=pdf_key, _external=True) if pdf_key else asset.get('pdf_url'),
+        'thumbnail_url': url_for('api.thumbnail', key=asset['thumbnail_key'], width=320, _external=True)
+        if asset.get('thumbnail_key') else None,
+        'glb_id': asset.get('glb_id'),
+        'model_url': url_for('admin.serve_model', file_id=model_id, _external=True) if model_id else None,
+        'version': asset.get('version'),
+    }
+
+
+@api_bp.route('/nearest')
+def nearest():
+    """
+    GET /api/nearest?lat=..&lon=..[&radius=metres]
+    The closest college within the radius and all of its assets, in one response.
+    """
+    default_radius = current_app.config['NEAREST_RADIUS_METERS']
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius') or default_radius)
+    except (KeyError, ValueError):
+        return jsonify({'error': "'lat' and 'lon' are required numbers."}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius <= 0:
+        return jsonify({'error': 'Coordinates or radius out of range.'}), 400
+    radius = min(radius, current_app.config['NEAREST_MAX_RADIUS_METERS'])
+
+    try:
+        college = nearest_college(mongo.db, lat, lon, radius)
+        if college is None:
+            return jsonify({'college': None, 'assets': []})
+
+        cursor = (mongo.db.assets.find({'coordinate_norm': college['coordinate_norm']}, ASSET_FIELDS)
+                  .sort('_id', 1)
+                  .limit(current_app.config['NEAREST_ASSET_LIMIT']))
+        assets = [asset_json(a) for a in cursor]
+    except Exception as e:
+        log_event('mongo_error', view='nearest', error=str(e))
+        return jsonify({'error': 'Lookup failed.'}), 503
+
+    college_lon, college_lat = college['location']['coordinates']
+    return jsonify({
+        'college': {
+            'id': str(college['_id']),
+            'name': college.get('college_name'),
+            'lat': college_lat,
+            'lon': college_lon,
+            'distance_m': round(college['distance_m'], 1),
+        },
+        'assets': assets,
+    })
+
+
+@api_bp.route('/colleges/<college_id>/manifest')
+def college_manifest(college_id):
+    """
+    GET /api/colleges/<id>/manifest[?since=<version>]
+    Compressed JSON list of a college's assets. With `since`, only assets
+    changed after that version (unless the response says "full": true).
+    Clients keep the returned "version" for their next sync.
+    """
+    since = request.args.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return jsonify({'error': "'since' must be a version number."}), 400
+        since = int(since)
+
+    try:
+        college = mongo.db.colleges.find_one({'_id': ObjectId(college_id)},
+                                             {'college_name': 1, 'coordinate_norm': 1, 'manifest_reset': 1})
+    except InvalidId:
+        college = None
+    if college is None:
+        return jsonify({'error': 'College not found'}), 404
+
+    # The ETag only needs the version, so an up-to-date client costs one indexed lookup
+    version = manifest_version(mongo.db, college)
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    etag = manifest_etag(college, version, since, encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        manifest = build_manifest(mongo.db, college, version, since, asset_json=asset_json)
+        response = Response(encode_manifest(manifest, encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Revalidate every time; the 304 path is cheap
+    response.cache_control.no_cache = True
+    return response
+
+
+@api_bp.route('/thumbnails/<key>/<int:width>')
+def thumbnail(key, width):
+    """
+    Preview image of an asset (first PDF page, or the card for slides).
+    Keys are content hashes, so a response never changes and is cached for a year.
+    """
+    try:
+        found = get_thumbnail(mongo.db, key, width)
+    except Exception as e:
+        log_event('mongo_error', view='thumbnail', key=key, error=str(e))
+        return jsonify({'error': 'Lookup failed.'}), 503
+    if found is None:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+
+    data, mime_type, served_width = found
+    response = Response(data, mimetype=mime_type)
+    response.set_etag(f"{key}-{served_width}")
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['THUMBNAIL_MAX_AGE']
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+@api_bp.route('/objects/<key>')
+def stored_object(key):
+    """
+    A stored file (uploaded document or card) by storage key. Served from
+    local disk when this server holds it, otherwise redirected to Drive.
+    """
+    if not is_storage_key(key):
+        return jsonify({'error': 'Object not found'}), 404
+    try:
+        response = get_storage().send(mongo.db, key, current_app.config['STORAGE_MAX_AGE'])
+        location = drive_location(mongo.db, key) if response is None else None
+    except Exception as e:
+        log_event('mongo_error', view='objects', key=key, error=str(e))
+        return jsonify({'error': 'Lookup failed.'}), 503
+    if response is not None:
+        return response
+    if location is None or not location[1]:
+        return jsonify({'error': 'Object not found'}), 404
+    return redirect(location[1])
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import login_user, logout_user, login_required, current_user
 from app import mongo, mail # Ensure mail is imported from app
-from app.models import User
+from app.models import User, USER_FIELDS, invalidate_user
 from flask_mail import Message
 from werkzeug.security import generate_password_hash
 
@@ -26,7 +26,7 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user_data = mongo.db.users.find_one({'username': username})
+        user_data = mongo.db.users.find_one({'username': username}, USER_FIELDS)
 
         if user_data:
             user = User(user_data)
@@ -44,7 +44,7 @@ def reset_request():
         return redirect(url_for('admin.generator'))
     if request.method == 'POST':
         email = request.form.get('email')
-        user_data = mongo.db.users.find_one({'email': email})
+        user_data = mongo.db.users.find_one({'email': email}, USER_FIELDS)
         if user_data:
             user = User(user_data)
             send_reset_email(user)
@@ -66,6 +66,7 @@ def reset_token(token):
         new_password = request.form.get('password')
         hashed_password = generate_password_hash(new_password)
         mongo.db.users.update_one({'_id': user_data['_id']}, {'$set': {'password_hash': hashed_password}})
+        invalidate_user(user_data['_id'])
         flash('Your password has been updated! You are now able to log in.')
         return redirect(url_for('auth.login'))
     return render_template('reset_token.html')
@@ -0,0 +1,78 @@
+import threading
+from app import mongo
+from app.metrics import log_event
+
+
+def ensure_indexes():
+    """
+    Creates the indexes the app relies on; safe to run again. Each index is
+    tried on its own, so one that can't be built doesn't stop the rest.
+    Returns the number of indexes that failed.
+    """
+    db = mongo.db
+    # Fail once, not once per index, when Mongo is unreachable
+    db.command('ping')
+    failed = 0
+
+    def index(collection, keys, **kwargs):
+        nonlocal failed
+        try:
+            collection.create_index(keys, **kwargs)
+        except Exception as e:
+            failed += 1
+            log_event('index_error', collection=collection.name, keys=str(keys), error=str(e))
+
+    # Job queue: claim_next_job filters on status and sorts by age
+    index(db.jobs, [('status', 1), ('created_at', 1)])
+
+    # Upload dedup lookups by content and extracted-text hash
+    index(db.assets, 'content_hash')
+    index(db.assets, 'text_hash')
+
+    # Library views: one college's coordinate, optionally a branch, one semester, paged by _id
+    index(db.assets, [('coordinate_norm', 1), ('semester_num', 1), ('_id', 1)])
+    index(db.assets, [('coordinate_norm', 1), ('branch', 1), ('semester_num', 1), ('_id', 1)])
+    index(db.assets, 'branch')
+    index(db.colleges, 'college_name')
+    index(db.colleges, 'coordinate_norm')
+
+    # Nearest-campus lookups for the AR app ($geoNear needs exactly one 2dsphere index)
+    index(db.colleges, [('location', '2dsphere')])
+
+    # Manifest delta sync: a college's assets changed after a given version
+    index(db.assets, [('coordinate_norm', 1), ('version', 1)])
+
+    # Login and password reset lookups. Partial, so users without an email
+    # (or with a null one) don't collide with each other.
+    index(db.users, 'username', unique=True,
+          partialFilterExpression={'username': {'$type': 'string'}})
+    index(db.users, 'email', unique=True,
+          partialFilterExpression={'email': {'$type': 'string'}})
+
+    # Tiered storage: objects not yet copied to Drive ({'replicated': {'$ne': True}})
+    index(db.storage_objects, 'replicated', name='replicated')
+
+    # Bulk import checkpoints
+    index(db.import_files, [('import_id', 1), ('path', 1)], unique=True)
+    index(db.import_files, [('import_id', 1), ('status', 1)])
+
+    return failed
+
+
+def ensure_indexes_in_background(app):
+    """
+    Runs ensure_indexes from a daemon thread, so a web process neither waits
+    for the build nor fails to start over it; the outcome is only logged.
+    """
+    def build():
+        with app.app_context():
+            try:
+                failed = ensure_indexes()
+            except Exception as e:
+                log_event('index_build_failed', error=str(e))
+                return
+            log_event('indexes_ensured', failed=failed)
+
+    thread = threading.Thread(target=build, name='ensure-indexes', daemon=True)
+    thread.start()
+    return thread
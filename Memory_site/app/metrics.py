@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, generate_latest,
+                               CONTENT_TYPE_LATEST, REGISTRY, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+
+# Instrumentation shared by the web app, the job workers and the summary server.
+#
+# With several processes (gunicorn workers, `flask run-workers`), point
+# PROMETHEUS_MULTIPROC_DIR at an empty directory shared by all of them before
+# they start; /metrics then aggregates every process, including the workers
+# that do the extraction/summarization/upload work.
+
+# Structured JSON lines: one per request with its stage timings, plus events
+event_log = logging.getLogger('memory_site')
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+STAGE_SECONDS = Histogram(
+    'memory_site_stage_seconds', 'Pipeline stage duration',
+    ['stage'], buckets=STAGE_BUCKETS)
+SUMMARY_TOKENS = Histogram(
+    'memory_site_summary_tokens', 'Tokens per summarized document',
+    ['direction'], buckets=(16, 32, 64, 128, 256, 512, 768, 1024))
+DRIVE_SECONDS = Histogram(
+    'memory_site_drive_call_seconds', 'Google Drive API call duration',
+    ['operation', 'outcome'], buckets=STAGE_BUCKETS)
+MONGO_SECONDS = Histogram(
+    'memory_site_mongo_query_seconds', 'Mongo query duration',
+    ['view', 'query'], buckets=FAST_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'memory_site_cache_requests_total', 'Cache lookups by result (hit ratio = hit / all)',
+    ['cache', 'result'])
+REQUEST_SECONDS = Histogram(
+    'memory_site_http_request_seconds', 'HTTP request duration',
+    ['endpoint', 'method', 'status'], buckets=FAST_BUCKETS + (10, 30))
+IN_FLIGHT = Gauge(
+    'memory_site_http_requests_in_flight', 'HTTP requests being served',
+    multiprocess_mode='livesum')
+
+
+def _record(name, seconds):
+    # Collected into the per-request timing log line when inside a request
+    if has_request_context():
+        timings = g.setdefault('timings', {})
+        timings[name] = round(timings.get(name, 0.0) + seconds * 1000, 2)
+
+
+@contextmanager
+def timed_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        _record(stage, seconds)
+
+
+@contextmanager
+def timed_drive(operation):
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        DRIVE_SECONDS.labels(operation, outcome).observe(seconds)
+        _record(f'drive.{operation}', seconds)
+
+
+@contextmanager
+def timed_query(view, query):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        MONGO_SECONDS.labels(view, query).observe(seconds)
+        _record(f'mongo.{query}', seconds)
+
+
+def count_cache(cache, result):
+    CACHE_REQUESTS.labels(cache, result).inc()
+
+
+def observe_tokens(input_tokens, output_tokens):
+    SUMMARY_TOKENS.labels('input').observe(input_tokens)
+    SUMMARY_TOKENS.labels('output').observe(output_tokens)
+
+
+def log_event(event, **fields):
+    """One structured (JSON) log line: requests, retries, failures."""
+    event_log.info(json.dumps({'event': event, **fields}, default=str))
+
+
+# --- Flask wiring ---
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.in_flight = True
+    IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    # Streamed bodies (Drive proxy, send_file) are still being sent after this
+    # returns, so the request stays in flight until the server closes the response
+    if g.pop('in_flight', None):
+        response.call_on_close(IN_FLIGHT.dec)
+    seconds = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(seconds)
+    log_event('request', method=request.method, path=request.path, endpoint=endpoint,
+              status=response.status_code, duration_ms=round(seconds * 1000, 2),
+              stages=g.get('timings', {}))
+    return response
+
+
+def _teardown_request(exc):
+    # Requests that raised never reach after_request
+    if g.pop('in_flight', None):
+        IN_FLIGHT.dec()
+
+
+class QueueDepthCollector:
+    """
+    Upload jobs by status, counted in Mongo on every scrape. Nothing is
+    stored per process, so the value is never stale or summed across workers.
+    """
+
+    def describe(self):
+        return [self._family()]
+
+    def _family(self):
+        return GaugeMetricFamily('memory_site_job_queue_depth', 'Upload jobs by status, counted at scrape time',
+                                 labels=['status'])
+
+    def collect(self):
+        from app import mongo
+        counts = {'queued': 0, 'running': 0}
+        try:
+            for row in mongo.db.jobs.aggregate([
+                {'$match': {'status': {'$in': list(counts)}}},
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}},
+            ]):
+                counts[row['_id']] = row['count']
+        except Exception as e:
+            # Leave the series out rather than report a made-up 0
+            log_event('queue_depth_failed', error=str(e))
+            return
+        family = self._family()
+        for status, count in counts.items():
+            family.add_metric([status], count)
+        yield family
+
+
+# Metrics computed at scrape time, served next to the process (or multiprocess) registry
+SCRAPE_REGISTRY = CollectorRegistry()
+SCRAPE_REGISTRY.register(QueueDepthCollector())
+
+
+def metrics_view():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry) + generate_latest(SCRAPE_REGISTRY), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Per-request timing, the structured timing log and the /metrics endpoint."""
+    if not event_log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        event_log.addHandler(handler)
+        event_log.setLevel(logging.INFO)
+        event_log.propagate = False
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
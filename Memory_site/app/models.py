@@ -1,11 +1,29 @@
+import time
+import threading
+from collections import OrderedDict
 from app import login_manager, mongo
-from flask_login import UserMixin
 from werkzeug.security import check_password_hash
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 from itsdangerous import URLSafeTimedSerializer as Serializer
 from flask import current_app
+from app.metrics import count_cache
+
+# The only fields the app reads from a user document
+USER_FIELDS = {'username': 1, 'password_hash': 1, 'role': 1, 'email': 1}
+
+
+class User:
+    """
+    The logged-in user. Flask-Login only needs the four members below, so
+    this skips UserMixin and keeps instances small enough to cache.
+    """
+    __slots__ = ('id', 'username', 'password_hash', 'role', 'email')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
 
-class User(UserMixin):
     def __init__(self, user_data):
         self.id = str(user_data.get('_id'))
         self.username = user_data.get('username')
@@ -14,6 +32,15 @@ class User(UserMixin):
         # Add email support (Ensure your MongoDB documents have an 'email' field)
         self.email = user_data.get('email')
 
+    def get_id(self):
+        return self.id
+
+    def __eq__(self, other):
+        return isinstance(other, User) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
@@ -30,11 +57,47 @@ class User(UserMixin):
             user_id = s.loads(token, max_age=expires_sec)['user_id']
         except Exception:
             return None
-        return mongo.db.users.find_one({'_id': ObjectId(user_id)})
+        return mongo.db.users.find_one({'_id': ObjectId(user_id)}, USER_FIELDS)
+
+
+# --- User cache ---
+# user_id -> (expires_at, User), least recently used first. Per process, so a
+# change made elsewhere (another worker, the CLI) shows up within USER_CACHE_TTL
+# seconds at the latest; the short default still absorbs a page's burst of requests.
+_users = OrderedDict()
+_users_lock = threading.Lock()
+
+
+def invalidate_user(user_id):
+    """Drops a cached user from this process's cache, e.g. after its password changed."""
+    with _users_lock:
+        _users.pop(str(user_id), None)
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    user_data = mongo.db.users.find_one({'_id': ObjectId(user_id)})
-    if user_data:
-        return User(user_data)
-    return None
\ No newline at end of file
+    now = time.monotonic()
+    with _users_lock:
+        cached = _users.get(user_id)
+        if cached is not None and cached[0] > now:
+            _users.move_to_end(user_id)
+            count_cache('user', 'hit')
+            return cached[1]
+    count_cache('user', 'miss')
+
+    try:
+        user_data = mongo.db.users.find_one({'_id': ObjectId(user_id)}, USER_FIELDS)
+    except InvalidId:
+        return None
+    if not user_data:
+        invalidate_user(user_id)
+        return None
+
+    user = User(user_data)
+    config = current_app.config
+    with _users_lock:
+        _users[user_id] = (now + config['USER_CACHE_TTL'], user)
+        _users.move_to_end(user_id)
+        while len(_users) > config['USER_CACHE_SIZE']:
+            _users.popitem(last=False)
+    return user
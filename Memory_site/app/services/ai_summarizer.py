@@ -1,63 +1,387 @@
 import re
-from transformers import BartForConditionalGeneration, BartTokenizer
-from pptx import Presentation
-# --- NEW: Load Model and Tokenizer Manually ---
-print("Loading BART Tokenizer and Model...")
+import json
+import zlib
+import hashlib
+import threading
+import urllib.request
+from collections import OrderedDict
+from app.metrics import observe_tokens, count_cache, log_event
+
+# Model, backend and model server settings; init_app replaces these
+# defaults with SUMMARY_MODEL, SUMMARY_BACKEND, SUMMARY_SERVER_URL and
+# SUMMARY_SERVER_TIMEOUT from the app config.
 model_name = "facebook/bart-large-cnn"
-try:
-    tokenizer = BartTokenizer.from_pretrained(model_name)
-    model = BartForConditionalGeneration.from_pretrained(model_name)
-    print("Model loaded successfully.")
-except Exception as e:
-    print(f"CRITICAL: Failed to load model or tokenizer. Error: {e}")
-    # Set them to None so the app can still run and report errors
-    tokenizer = None
-    model = None
+backend_name = "torch"
+SUMMARY_SERVER_URL = None
+SUMMARY_SERVER_TIMEOUT = 600.0
+
+
+
+def init_app(app):
+    global model_name, backend_name, SUMMARY_SERVER_URL, SUMMARY_SERVER_TIMEOUT
+    model_name = app.config['SUMMARY_MODEL']
+    backend_name = app.config['SUMMARY_BACKEND']
+    SUMMARY_SERVER_URL = app.config['SUMMARY_SERVER_URL']
+    SUMMARY_SERVER_TIMEOUT = app.config['SUMMARY_SERVER_TIMEOUT']
+
+
+# The model is loaded lazily on first use, not at import time, so importing
+# this module is cheap. The tokenizer is loaded on its own because chunking
+# needs it even when the model lives in the server process.
+tokenizer = None
+model = None
+_load_error = None
+_load_lock = threading.Lock()
+
+
+def load_tokenizer():
+    global tokenizer
+    if tokenizer is None:
+        with _load_lock:
+            if tokenizer is None:
+                from transformers import AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+    return tokenizer
+
+
+def load_model():
+    """Loads the tokenizer and model once per process. Returns True on success."""
+    global model, _load_error
+    if model is not None:
+        return True
+    try:
+        load_tokenizer()
+        with _load_lock:
+            if model is None:
+                from app.services.summarizer_backends import load_backend
+                log_event('model_loading', model=model_name, backend=backend_name)
+                model = load_backend(backend_name, model_name)
+                _load_error = None
+                log_event('model_loaded', model=model_name, backend=backend_name)
+    except Exception as e:
+        log_event('model_load_failed', model=model_name, backend=backend_name, error=str(e))
+        _load_error = str(e)
+        return False
+    return True
+
+
+def model_status():
+    """Health information about the in-process model."""
+    return {
+        'model': model_name,
+        'backend': backend_name,
+        'loaded': model is not None,
+        'error': _load_error,
+    }
+
+
+# How many documents go through model.generate together.
+# Larger batches amortise the per-call overhead but need more RAM.
+DEFAULT_BATCH_SIZE = 4
+MAX_INPUT_TOKENS = 1024
+
+# Chunked (map-reduce) mode for documents longer than the model window.
+# Two tokens of every window are reserved for <s> and </s>.
+CHUNK_TOKENS = MAX_INPUT_TOKENS - 2
+CHUNK_OVERLAP_TOKENS = 128
+# Reduce rounds before we give up and let the final call truncate
+MAX_REDUCE_DEPTH = 3
+
+MODEL_UNAVAILABLE = "Error: Summarization model is not available. Please check server logs."
+NO_VALID_TEXT = "The PDF contained no valid text to summarize."
+SUMMARY_FAILED = "Error: A critical error occurred during summarization. Check server logs."
+# Every failure above starts with this; callers must never treat such a string as a summary
+SUMMARY_ERROR_PREFIX = "Error:"
+
+
+def is_summary_error(summary):
+    return summary.startswith(SUMMARY_ERROR_PREFIX)
+
+
+def clean_text(text_content: str) -> str:
+    """Strips control characters and collapses whitespace."""
+    return re.sub(r'\s+', ' ', re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text_content)).strip()
+
 
 def summarize_text_with_bart(text_content: str) -> str:
     """
     Manually tokenizes, generates, and decodes a summary to avoid pipeline errors.
     """
-    # First, check if the model loaded correctly on startup
-    if not model or not tokenizer:
-        return "Error: Summarization model is not available. Please check server logs."
-        
+    return summarize_texts_with_bart([text_content], max_batch_size=1)[0]
+
+
+def summarize_texts_with_bart(text_contents, max_batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Summarizes several documents with as few model.generate calls as possible.
+    Goes through the model server when SUMMARY_SERVER_URL is set.
+    Returns the summaries in the same order as text_contents.
+    """
+    if SUMMARY_SERVER_URL:
+        return remote_summarize(text_contents, max_batch_size)
+    return local_summarize(text_contents, max_batch_size)
+
+
+def remote_summarize(text_contents, max_batch_size=DEFAULT_BATCH_SIZE):
+    """Thin client for the model server's /summarize endpoint."""
+    payload = json.dumps({'texts': list(text_contents), 'max_batch_size': max_batch_size}).encode('utf-8')
+    req = urllib.request.Request(f"{SUMMARY_SERVER_URL.rstrip('/')}/summarize", data=payload,
+                                 headers={'Content-Type': 'application/json'}, method='POST')
     try:
-        # Text cleaning step is still important
-        cleaned_text = re.sub(r'\s+', ' ', re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text_content)).strip()
-        if not cleaned_text:
-            return "The PDF contained no valid text to summarize."
+        with urllib.request.urlopen(req, timeout=SUMMARY_SERVER_TIMEOUT) as resp:
+            return json.loads(resp.read().decode('utf-8'))['summaries']
+    except Exception as e:
+        log_event('summary_server_error', operation='summarize', error=str(e))
+        return [SUMMARY_FAILED] * len(text_contents)
+
 
-        # 1. Tokenize the text
-        # The tokenizer converts the text into a format the model understands (input IDs)
+def server_health():
+    """Returns the model server's /health report, or None if it is unreachable."""
+    if not SUMMARY_SERVER_URL:
+        return None
+    try:
+        with urllib.request.urlopen(f"{SUMMARY_SERVER_URL.rstrip('/')}/health", timeout=5) as resp:
+            return json.loads(resp.read().decode('utf-8'))
+    except Exception as e:
+        log_event('summary_server_error', operation='health', error=str(e))
+        return None
+
+
+def local_summarize(text_contents, max_batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Runs the model in this process.
+
+    Documents are sorted by token length and grouped into buckets of at most
+    max_batch_size, so each padded batch wastes little compute on padding.
+    """
+    if not load_model():
+        return [MODEL_UNAVAILABLE] * len(text_contents)
+    return generate_summaries(tokenizer, model, text_contents, max_batch_size)
+
+
+def generate_summaries(tok, mdl, text_contents, max_batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Batched tokenize -> generate -> decode with an explicit tokenizer/model
+    pair, so backend comparisons can run several models side by side.
+    """
+    summaries = [NO_VALID_TEXT] * len(text_contents)
+    try:
+        cleaned = [clean_text(text) for text in text_contents]
+        pending = [i for i, text in enumerate(cleaned) if text]
+        if not pending:
+            return summaries
+
+        # 1. Tokenize every document once, without padding, to learn its length.
         # We truncate the input to the model's maximum of 1024 tokens.
-        inputs = tokenizer(
-            [cleaned_text],
-            max_length=1024,
-            return_tensors="pt", # pt = PyTorch tensors
+        encoded = tok(
+            [cleaned[i] for i in pending],
+            max_length=MAX_INPUT_TOKENS,
             truncation=True
         )
+        token_ids = dict(zip(pending, encoded["input_ids"]))
+    except Exception as e:
+        log_event('summarize_failed', stage='tokenize', error=str(e))
+        return [SUMMARY_FAILED] * len(text_contents)
 
-        # 2. Generate the summary
-        # The model generates a sequence of token IDs representing the summary
-        summary_ids = model.generate(
-            inputs["input_ids"],
-            num_beams=4,
-            max_length=150,
-            min_length=40,
-            early_stopping=True
-        )
+    # 2. Bucket by length so documents of similar size are padded together
+    order = sorted(pending, key=lambda i: len(token_ids[i]))
+    batch_size = max(1, max_batch_size or 1)
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        try:
+            batch = tok.pad(
+                {"input_ids": [token_ids[i] for i in bucket]},
+                return_tensors="pt" # pt = PyTorch tensors
+            )
+
+            # 3. Generate the summaries for the whole bucket in one call
+            summary_ids = mdl.generate(
+                batch["input_ids"],
+                attention_mask=batch["attention_mask"],
+                num_beams=4,
+                max_length=150,
+                min_length=40,
+                early_stopping=True
+            )
+
+            # 4. Decode back into human-readable text
+            decoded = tok.batch_decode(
+                summary_ids,
+                skip_special_tokens=True,
+                clean_up_tokenization_spaces=False
+            )
+            for i, summary, ids in zip(bucket, decoded, summary_ids):
+                summaries[i] = summary
+                observe_tokens(len(token_ids[i]), int((ids != tok.pad_token_id).sum()))
+
+        except Exception as e:
+            log_event('summarize_failed', stage='generate', documents=len(bucket), error=str(e))
+            for i in bucket:
+                summaries[i] = SUMMARY_FAILED
+
+    return summaries
+
+
+class LRUChunkCache:
+    """Small in-process cache of chunk summaries keyed by chunk hash."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[key] = self._entries[key]
+        return found
+
+    def put_many(self, items):
+        for key, summary in items.items():
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def chunk_cache_key(chunk_text):
+    """Chunks are cached per model and backend, so switching either never serves stale text."""
+    return hashlib.sha256(f"{model_name}:{backend_name}\n{chunk_text}".encode('utf-8')).hexdigest()
+
+
+def split_into_chunks(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Splits cleaned text into overlapping windows of at most chunk_tokens tokens.
+
+    Windows are built from whole sentences. Besides the size limit, a window
+    also closes after an "anchor" sentence (chosen from a hash of its text)
+    once it is at least half full. Anchors move with the content, so an edit
+    only changes the windows around it and the rest still hit the cache.
+    """
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+', text) if s]
+    lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+
+    # Sentences that do not fit in a window on their own are split on words
+    pieces = []
+    for sentence, length in zip(sentences, lengths):
+        if length <= chunk_tokens:
+            pieces.append((sentence, length))
+            continue
+        words = sentence.split(' ')
+        step = max(1, len(words) * chunk_tokens // (2 * length))
+        for i in range(0, len(words), step):
+            piece = ' '.join(words[i:i + step])
+            pieces.append((piece, len(tokenizer(piece, add_special_tokens=False)["input_ids"])))
 
-        # 3. Decode the summary
-        # The tokenizer converts the token IDs back into human-readable text
-        summary = tokenizer.batch_decode(
-            summary_ids,
-            skip_special_tokens=True,
-            clean_up_tokenization_spaces=False
-        )[0] # Get the first (and only) summary from the batch
+    chunks = []
+    current, current_len, fresh = [], 0, 0
 
-        return summary
+    def close_window(next_length):
+        chunks.append(' '.join(p for p, _ in current))
+        # Carry the tail of the closed window over as overlap
+        carried, carried_len = [], 0
+        for p, l in reversed(current):
+            if carried_len + l > overlap_tokens or carried_len + l + next_length > chunk_tokens:
+                break
+            carried.insert(0, (p, l))
+            carried_len += l
+        return carried, carried_len
 
+    for piece, length in pieces:
+        if fresh and current_len + length > chunk_tokens:
+            current, current_len = close_window(length)
+            fresh = 0
+
+        current.append((piece, length))
+        current_len += length
+        fresh += 1
+
+        if current_len >= chunk_tokens // 2 and zlib.crc32(piece.encode('utf-8')) % 8 == 0:
+            current, current_len = close_window(0)
+            fresh = 0
+
+    # Only emit the last window if it holds more than carried-over overlap
+    if fresh:
+        chunks.append(' '.join(p for p, _ in current))
+    return chunks
+
+
+def _summarize_chunks(chunks, chunk_cache, max_batch_size):
+    """Summarizes chunk texts, only running the model for cache misses."""
+    keys = [chunk_cache_key(chunk) for chunk in chunks]
+    cached = chunk_cache.get_many(list(set(keys)))
+
+    missing = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in cached:
+            missing[key] = chunk
+        count_cache('summary_chunks', 'miss' if key not in cached else 'hit')
+
+    if missing:
+        log_event('chunk_summaries', chunks=len(chunks), cached=len(chunks) - len(missing))
+        missing_keys = list(missing)
+        fresh = summarize_texts_with_bart([missing[k] for k in missing_keys], max_batch_size=max_batch_size)
+        computed = {k: summary for k, summary in zip(missing_keys, fresh)
+                    if not is_summary_error(summary)}
+        chunk_cache.put_many(computed)
+        cached.update(dict(zip(missing_keys, fresh)))
+
+    return [cached[key] for key in keys]
+
+
+def summarize_long_texts(text_contents, chunk_cache=None, max_batch_size=DEFAULT_BATCH_SIZE,
+                         chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Hierarchical map-reduce summarization for documents of any length.
+
+    Documents that fit in the model window are summarized directly. Longer
+    ones are split into overlapping windows (map), every window of every
+    document is summarized in shared batches, and the joined window summaries
+    are summarized again (reduce) until they fit in a single window.
+    Chunk summaries go through chunk_cache, so re-summarizing an edited
+    document only recomputes the windows that changed. A document with a
+    failed window gets that window's error string, not a reduced summary.
+    """
+    try:
+        load_tokenizer()
+    except Exception as e:
+        log_event('model_load_failed', model=model_name, part='tokenizer', error=str(e))
+        return [MODEL_UNAVAILABLE] * len(text_contents)
+
+    chunk_cache = chunk_cache if chunk_cache is not None else LRUChunkCache()
+    current = [clean_text(text) for text in text_contents]
+    # Documents with a failed window: index -> error string
+    failed = {}
+
+    try:
+        for _ in range(MAX_REDUCE_DEPTH):
+            lengths = [len(ids) for ids in tokenizer(current, add_special_tokens=False)["input_ids"]]
+            long_docs = [i for i, length in enumerate(lengths) if length > chunk_tokens and i not in failed]
+            if not long_docs:
+                break
+
+            # Map: every window of every long document goes through the same batches
+            doc_chunks = {i: split_into_chunks(current[i], chunk_tokens, overlap_tokens) for i in long_docs}
+            flat = [chunk for i in long_docs for chunk in doc_chunks[i]]
+            flat_summaries = iter(_summarize_chunks(flat, chunk_cache, max_batch_size))
+
+            # Reduce: the concatenated window summaries become the next round's input.
+            # Reducing an error message would hide the failure, so those documents stop here.
+            for i in long_docs:
+                window_summaries = [next(flat_summaries) for _ in doc_chunks[i]]
+                error = next((s for s in window_summaries if is_summary_error(s)), None)
+                if error:
+                    failed[i] = error
+                else:
+                    current[i] = ' '.join(window_summaries)
     except Exception as e:
-        print(f"A critical error occurred during manual summarization: {e}")
-        return "Error: A critical error occurred during summarization. Check server logs."
\ No newline at end of file
+        log_event('summarize_failed', stage='chunked', error=str(e))
+        return [SUMMARY_FAILED] * len(text_contents)
+
+    remaining = [i for i in range(len(current)) if i not in failed]
+    summaries = dict(failed)
+    if remaining:
+        final = summarize_texts_with_bart([current[i] for i in remaining], max_batch_size=max_batch_size)
+        summaries.update(zip(remaining, final))
+    return [summaries[i] for i in range(len(current))]
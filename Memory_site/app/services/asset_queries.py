@@ -0,0 +1,129 @@
+import re
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from app.services.facets import invalidate_facets
+
+SEMESTERS = range(1, 9)
+# semester_num for anything that isn't S1..S8 (the "Other" bucket)
+OTHER_SEMESTER = 0
+
+
+def normalize_coordinate(coordinate):
+    """'11.83, 12.43 ' -> '11.83,12.43', the form assets and colleges are matched on."""
+    return str(coordinate).replace(" ", "").strip().lower() if coordinate else ""
+
+
+def semester_number(semester):
+    """First number in the semester label if it's 1-8, else OTHER_SEMESTER."""
+    match = re.search(r'(\d+)', str(semester or ''))
+    if match and int(match.group(1)) in SEMESTERS:
+        return int(match.group(1))
+    return OTHER_SEMESTER
+
+
+def coordinate_point(coordinate):
+    """
+    'lat,lon' string -> GeoJSON Point (GeoJSON order is [lon, lat]).
+    Returns None when the string doesn't parse or is out of range.
+    """
+    try:
+        lat, lon = (float(part) for part in normalize_coordinate(coordinate).split(','))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return {'type': 'Point', 'coordinates': [lon, lat]}
+
+
+def college_fields(coordinate):
+    """Indexed fields stored next to a college's raw coordinate string."""
+    return {
+        'coordinate_norm': normalize_coordinate(coordinate),
+        'location': coordinate_point(coordinate),
+    }
+
+
+def typed_fields(coordinate, semester):
+    """Indexed fields stored next to the raw form values on every asset."""
+    return {
+        'coordinate_norm': normalize_coordinate(coordinate),
+        'semester_num': semester_number(semester),
+    }
+
+
+def asset_filter(db, college=None, branch=None, semester=None):
+    """
+    Mongo filter for the library views. A college is resolved to its
+    normalized coordinate(s) first, so assets are matched through the index.
+    """
+    query = {}
+    if college:
+        coords = [c['coordinate_norm'] for c in db.colleges.find(
+            {'college_name': college}, {'coordinate_norm': 1}) if c.get('coordinate_norm')]
+        query['coordinate_norm'] = {'$in': coords}
+    if branch:
+        query['branch'] = branch
+    if semester is not None:
+        query['semester_num'] = semester
+    return query
+
+
+def list_assets(db, projection, college=None, branch=None, semester=None, after=None, limit=50):
+    """
+    One page of assets in _id order. `after` is the last _id of the previous
+    page; returns (assets, next_after) with next_after None on the last page.
+    """
+    query = asset_filter(db, college, branch, semester)
+    if after:
+        query['_id'] = {'$gt': ObjectId(after)}
+
+    # One extra row tells whether there is a next page without a count()
+    assets = list(db.assets.find(query, projection).sort('_id', 1).limit(limit + 1))
+    next_after = str(assets[limit - 1]['_id']) if len(assets) > limit else None
+    return assets[:limit], next_after
+
+
+def backfill_typed_fields(db, batch_size=1000):
+    """
+    Adds coordinate_norm/semester_num to assets, and coordinate_norm plus the
+    GeoJSON location to colleges, for documents saved before these fields
+    existed. Returns (assets, colleges) updated.
+    """
+    jobs = (
+        (db.assets, {'coordinate_norm': {'$exists': False}},
+         lambda doc: typed_fields(doc.get('coordinate'), doc.get('semester'))),
+        (db.colleges, {'$or': [{'coordinate_norm': {'$exists': False}}, {'location': {'$exists': False}}]},
+         lambda doc: college_fields(doc.get('coordinate'))),
+    )
+    counts = []
+    for collection, query, fields_for in jobs:
+        ops, updated = [], 0
+        for doc in collection.find(query, {'coordinate': 1, 'semester': 1}):
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': fields_for(doc)}))
+            if len(ops) >= batch_size:
+                updated += collection.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+        counts.append(updated)
+    if any(counts):
+        invalidate_facets(db)
+    return tuple(counts)
+
+
+def nearest_college(db, lat, lon, max_distance_m):
+    """
+    Closest college within max_distance_m metres of (lat, lon), with a
+    'distance_m' field, or None. Uses the 2dsphere index on colleges.location.
+    """
+    results = list(db.colleges.aggregate([
+        {'$geoNear': {
+            'near': {'type': 'Point', 'coordinates': [lon, lat]},
+            'distanceField': 'distance_m',
+            'maxDistance': max_distance_m,
+            'spherical': True,
+        }},
+        {'$limit': 1},
+        {'$project': {'college_name': 1, 'coordinate_norm': 1, 'location': 1, 'distance_m': 1}},
+    ]))
+    return results[0] if results else None
@@ -0,0 +1,187 @@
+import os
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from app import mongo
+from app.services.job_queue import ALLOWED_EXTENSIONS
+
+# Import lifecycle, checkpointed in Mongo so an interrupted run resumes:
+#   imports:      one document per (directory, college coordinate, semester, branch)
+#   import_files: one document per file, pending -> done | failed
+# A rerun skips files already done and retries the failed ones.
+
+
+def find_import_files(root):
+    """Every supported file under root, in a stable order."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS:
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def import_id_for(root, coordinate, semester, branch):
+    raw = '\n'.join([os.path.abspath(root), str(coordinate), str(semester), str(branch)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def prepare_import(db, root, coordinate, semester, branch):
+    """Records the import and its files. Returns (import_id, pending paths)."""
+    import_id = import_id_for(root, coordinate, semester, branch)
+    now = datetime.now(timezone.utc)
+    db.imports.update_one(
+        {'_id': import_id},
+        {'$set': {'updated_at': now},
+         '$setOnInsert': {'root': os.path.abspath(root), 'coordinate': coordinate, 'semester': semester,
+                          'branch': branch, 'created_at': now}},
+        upsert=True,
+    )
+
+    paths = find_import_files(root)
+    done = {doc['path'] for doc in db.import_files.find({'import_id': import_id, 'status': 'done'}, {'path': 1})}
+    pending = [path for path in paths if path not in done]
+    if pending:
+        db.import_files.bulk_write([
+            UpdateOne({'import_id': import_id, 'path': path},
+                      {'$set': {'status': 'pending', 'error': None}}, upsert=True)
+            for path in pending
+        ], ordered=False)
+    return import_id, pending, len(paths) - len(pending)
+
+
+def _checkpoint(db, import_id, path, result, error):
+    db.import_files.update_one(
+        {'import_id': import_id, 'path': path},
+        {'$set': {'status': 'failed' if error else 'done', 'error': error,
+                  'asset_id': result and result['asset_id'],
+                  'duplicate_of': result and result['duplicate_of'],
+                  'updated_at': datetime.now(timezone.utc)}})
+
+
+def _already_imported(db, path, coordinate, semester, branch):
+    """
+    The asset an earlier run saved for this file but was killed before
+    checkpointing, or None. Matched on the file's bytes and name and the
+    import's college, semester and branch.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except OSError:
+        return None  # The pipeline reports it
+    return db.assets.find_one({'content_hash': digest.hexdigest(), 'filename': os.path.basename(path),
+                               'coordinate': coordinate, 'semester': semester, 'branch': branch},
+                              {'_id': 1})
+
+
+# --- Worker side ---
+
+_worker_app = None
+
+
+def _init_worker():
+    # Spawned processes build their own app (and Mongo client) once
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app()
+    _worker_app.app_context().push()
+
+
+def import_batch(import_id, batch, coordinate, semester, branch):
+    """
+    Runs one batch of paths through the full pipeline (extraction, batched
+    summarization, cards, concurrent Drive uploads) in its own workspace.
+    Each file is checkpointed as soon as its asset is saved, so a run killed
+    mid-batch doesn't import the finished files again; a file whose asset
+    was saved just before the kill is found by its content hash instead.
+    Returns [(path, result, error message)] and the batch's byte count.
+    """
+    from flask import current_app
+    from app.services.pipeline import process_files
+    from app.services.workspace import JobWorkspace
+
+    config = current_app.config
+    outcomes = []
+    todo = []
+    for path in batch:
+        existing = _already_imported(mongo.db, path, coordinate, semester, branch)
+        if existing:
+            outcome = (path, {'asset_id': str(existing['_id']), 'duplicate_of': None}, None)
+            _checkpoint(mongo.db, import_id, *outcome)
+            outcomes.append(outcome)
+        else:
+            todo.append(path)
+
+    if todo:
+        files = [(index, path, os.path.basename(path)) for index, path in enumerate(todo)]
+        with JobWorkspace(f"import-{os.getpid()}", root=config['WORKSPACE_ROOT'],
+                          in_memory=config['WORKSPACE_IN_MEMORY']) as workspace:
+            for index, result, error in process_files(files, coordinate, semester, branch, mongo.db,
+                                                      batch_size=config['SUMMARY_BATCH_SIZE'],
+                                                      summary_mode=config['SUMMARY_MODE'],
+                                                      upload_workers=config['DRIVE_UPLOAD_WORKERS'],
+                                                      extract_workers=config['EXTRACT_WORKERS'],
+                                                      workspace=workspace):
+                outcome = (todo[index], result, str(error) if error else None)
+                _checkpoint(mongo.db, import_id, *outcome)
+                outcomes.append(outcome)
+    return outcomes, sum(os.path.getsize(path) for path in batch)
+
+
+# --- Driver ---
+
+def run_import(root, coordinate, semester, branch, workers=1, batch_files=8):
+    """
+    Imports a directory tree, batch_files per pipeline call, on `workers`
+    spawned processes (in-process when workers is 1). Progress is
+    checkpointed after every file. Returns the final stats dict.
+    """
+    db = mongo.db
+    import_id, pending, already_done = prepare_import(db, root, coordinate, semester, branch)
+    print(f"Import {import_id}: {len(pending)} file(s) to process, {already_done} already done.")
+
+    stats = {'import_id': import_id, 'done': 0, 'duplicates': 0, 'failed': 0, 'bytes': 0,
+             'skipped': already_done, 'seconds': 0.0}
+    if not pending:
+        return stats
+
+    batches = [pending[i:i + batch_files] for i in range(0, len(pending), batch_files)]
+    tasks = [(import_id, batch, coordinate, semester, branch) for batch in batches]
+    started = time.perf_counter()
+
+    def record(outcomes, size):
+        for _, result, error in outcomes:
+            if error:
+                stats['failed'] += 1
+            else:
+                stats['done'] += 1
+                stats['duplicates'] += bool(result['duplicate_of'])
+        stats['bytes'] += size
+        elapsed = time.perf_counter() - started
+        processed = stats['done'] + stats['failed']
+        print(f"  {processed}/{len(pending)} files | {processed / elapsed:.2f} files/s | "
+              f"{stats['bytes'] / elapsed / 1024 ** 2:.2f} MB/s | {stats['failed']} failed")
+
+    if workers <= 1:
+        for task in tasks:
+            record(*import_batch(*task))
+    else:
+        # 'spawn' for the same reason as the job workers: no forked torch/Mongo state.
+        # Not multiprocessing.Pool: its workers are daemonic and so can't start
+        # the text extraction pool (EXTRACT_WORKERS) for large PDFs.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as pool:
+            for future in as_completed([pool.submit(import_batch, *task) for task in tasks]):
+                record(*future.result())
+
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    db.imports.update_one({'_id': import_id}, {'$set': {
+        'updated_at': datetime.now(timezone.utc), 'last_run': stats}})
+    return stats
@@ -0,0 +1,108 @@
+import threading
+from pymongo import ReturnDocument
+from app.metrics import count_cache
+
+# Bumped on every asset/college write. Each process keeps the last facets it
+# computed and only re-aggregates when the generation in Mongo has moved,
+# so workers inserting assets invalidate the web processes' caches too.
+COUNTER_ID = 'facets'
+
+_cache = {'generation': None, 'facets': None}
+_cache_lock = threading.Lock()
+
+
+def invalidate_facets(db):
+    """Call after inserting, editing or deleting an asset or a college."""
+    db.counters.find_one_and_update(
+        {'_id': COUNTER_ID},
+        {'$inc': {'generation': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _generation(db):
+    doc = db.counters.find_one({'_id': COUNTER_ID}, {'generation': 1})
+    return doc['generation'] if doc else 0
+
+
+def compute_facets(db):
+    """
+    One aggregation over assets: rows are first collapsed to one per
+    (coordinate, branch, semester), then joined to colleges on the
+    normalized coordinate, so the $lookup runs per group, not per asset.
+    """
+    pipeline = [
+        {'$group': {
+            '_id': {'coordinate_norm': '$coordinate_norm', 'branch': '$branch', 'semester_num': '$semester_num'},
+            'count': {'$sum': 1},
+        }},
+        {'$lookup': {
+            'from': 'colleges',
+            'localField': '_id.coordinate_norm',
+            'foreignField': 'coordinate_norm',
+            'as': 'college',
+        }},
+        {'$project': {
+            '_id': 0,
+            'coordinate_norm': '$_id.coordinate_norm',
+            'branch': '$_id.branch',
+            'semester_num': '$_id.semester_num',
+            'count': 1,
+            'college_name': {'$ifNull': [{'$arrayElemAt': ['$college.college_name', 0]}, 'Unknown']},
+        }},
+        {'$facet': {
+            'branches': [
+                {'$match': {'branch': {'$nin': [None, '']}}},
+                {'$group': {'_id': '$branch'}},
+            ],
+            'coordinates': [
+                {'$group': {'_id': '$coordinate_norm', 'college_name': {'$first': '$college_name'}}},
+            ],
+            'semesters': [
+                {'$group': {
+                    '_id': {'college_name': '$college_name', 'branch': '$branch', 'semester_num': '$semester_num'},
+                    'count': {'$sum': '$count'},
+                }},
+            ],
+        }},
+    ]
+    result = next(db.assets.aggregate(pipeline), {'branches': [], 'coordinates': [], 'semesters': []})
+
+    # counts[college][branch][semester_num]; the None branch key holds all branches
+    counts = {}
+    for row in result['semesters']:
+        key = row['_id']
+        per_branch = counts.setdefault(key['college_name'], {})
+        for branch in {key.get('branch'), None}:
+            per_sem = per_branch.setdefault(branch, {})
+            per_sem[key.get('semester_num')] = per_sem.get(key.get('semester_num'), 0) + row['count']
+
+    return {
+        'branch_names': sorted(set(str(row['_id']).strip() for row in result['branches'])),
+        # The dropdown lists every college, including those without assets yet
+        'college_names': sorted(n for n in db.colleges.distinct('college_name') if n),
+        'coord_to_college': {row['_id']: row['college_name'] for row in result['coordinates'] if row['_id']},
+        'semester_counts': counts,
+    }
+
+
+def get_facets(db):
+    """Cached facets; one small counters lookup per call while nothing changed."""
+    generation = _generation(db)
+    with _cache_lock:
+        if _cache['facets'] is not None and _cache['generation'] == generation:
+            count_cache('facets', 'hit')
+            return _cache['facets']
+    count_cache('facets', 'miss')
+
+    facets = compute_facets(db)
+    with _cache_lock:
+        _cache['generation'] = generation
+        _cache['facets'] = facets
+    return facets
+
+
+def semester_counts(facets, college, branch=None):
+    """{semester_num: count} for one college, optionally one branch."""
+    return facets['semester_counts'].get(college, {}).get(branch, {})
@@ -1,22 +1,143 @@
 import os
+import time
+import random
+import socket
+import tempfile
+import threading
+import httplib2
+import google_auth_httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import HttpRequest, MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
 from googleapiclient.errors import HttpError
 from google.auth.transport.requests import Request
-# ... (keep existing imports and code)
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-from io import BytesIO  # <--- Add this import at the top if missing
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import timed_drive, log_event
+
+try:
+    import fcntl  # Serializes token refreshes across worker processes (POSIX only)
+except ImportError:
+    fcntl = None
+
+# One Drive service per process. The discovery document comes from the copy
+# bundled with googleapiclient (static_discovery) instead of being fetched and
+# parsed on every call, and credentials live in memory after the first load.
+_service = None
+_service_lock = threading.Lock()
+_creds = None
+_creds_lock = threading.Lock()
+# httplib2.Http is not thread-safe, so every thread gets its own connection
+_thread_local = threading.local()
+
+
+def _thread_http():
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = google_auth_httplib2.AuthorizedHttp(get_oauth_credentials(), http=httplib2.Http())
+        _thread_local.http = http
+    return http
+
+
+def _build_request(http, *args, **kwargs):
+    """requestBuilder for the shared service: binds each request to this thread's Http."""
+    # Refreshes the shared token under the lock if it is about to expire
+    get_oauth_credentials()
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
 
 def get_drive_service():
-    """Helper to get the authenticated service."""
-    creds = get_oauth_credentials()
-    return build('drive', 'v3', credentials=creds)
+    """Helper to get the authenticated, process-wide cached service."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = build('drive', 'v3',
+                                 credentials=get_oauth_credentials(),
+                                 requestBuilder=_build_request,
+                                 static_discovery=True,
+                                 cache_discovery=False)
+    return _service
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB per ranged request
+
+
+def get_file_metadata(file_id, fields='id, name, size, mimeType, md5Checksum'):
+    """Returns Drive metadata for a file (size is a string, as Drive sends it)."""
+    service = get_drive_service()
+    with timed_drive('metadata'):
+        return service.files().get(fileId=file_id, fields=fields).execute()
+
+
+def get_files_metadata(file_ids, fields='id, name, size, mimeType, md5Checksum'):
+    """
+    Fetches metadata for many files with batch requests (up to 100 calls per
+    HTTP round trip). Returns {file_id: metadata}, with None for files Drive
+    reports as missing; files whose lookup failed otherwise are left out.
+    """
+    service = get_drive_service()
+    results = {}
+
+    def collect(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        elif isinstance(exception, HttpError) and exception.resp.status == 404:
+            results[request_id] = None
+        else:
+            log_event('drive_error', operation='batch_metadata', file_id=request_id, error=str(exception))
+
+    file_ids = list(dict.fromkeys(file_ids))
+    for start in range(0, len(file_ids), 100):
+        batch = service.new_batch_http_request(callback=collect)
+        for file_id in file_ids[start:start + 100]:
+            batch.add(service.files().get(fileId=file_id, fields=fields), request_id=file_id)
+        with timed_drive('batch_metadata'):
+            batch.execute()
+    return results
+
+
+def iter_file_chunks(file_id, start=0, end=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Generator that downloads bytes start..end (inclusive, end=None means to
+    the end of the file) with one ranged request per chunk and yields each
+    chunk as soon as it arrives. Memory use stays at one chunk per download.
+    """
+    service = get_drive_service()
+    request = service.files().get_media(fileId=file_id)
+
+    offset = start
+    while end is None or offset <= end:
+        last = offset + chunk_size - 1
+        if end is not None:
+            last = min(last, end)
+        headers = dict(request.headers)
+        headers['range'] = f'bytes={offset}-{last}'
+        with timed_drive('download_chunk'):
+            resp, content = request.http.request(request.uri, method='GET', headers=headers)
+
+        if resp.status == 416:
+            # Asked past the end (e.g. an empty file)
+            return
+        if resp.status not in (200, 206):
+            raise HttpError(resp, content, uri=request.uri)
+
+        if content:
+            yield content
+        offset += len(content)
+
+        # A plain 200 means Drive ignored the range and sent everything
+        if resp.status == 200 or not content:
+            return
+        total = resp.get('content-range', '').rpartition('/')[2]
+        if total.isdigit() and offset >= int(total):
+            return
+
 
 def stream_file(file_id):
     """
     Downloads a file into memory to stream it to the user.
+    Buffers the whole file; prefer iter_file_chunks for large downloads.
     """
     try:
         service = get_drive_service()
@@ -32,7 +153,7 @@ def stream_file(file_id):
         file_stream.seek(0)
         return file_stream
     except Exception as e:
-        print(f"Error streaming file: {e}")
+        log_event('drive_error', operation='stream', file_id=file_id, error=str(e))
         return None
 
 
@@ -48,17 +169,35 @@ SCOPES = ['https://www.googleapis.com/auth/drive.file']
 # ----------------------------------
 
 
-def get_oauth_credentials():
-    """Gets OAuth credentials, refreshes or logs in once."""
-    creds = None
+def _write_token(creds):
+    """Writes token.json atomically so other processes never read half a file."""
+    token_dir = os.path.dirname(os.path.abspath(TOKEN_FILE))
+    fd, tmp_path = tempfile.mkstemp(dir=token_dir, prefix='.token-')
+    try:
+        with os.fdopen(fd, 'w') as token:
+            token.write(creds.to_json())
+        os.replace(tmp_path, TOKEN_FILE)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
-    # Load existing token
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
-    # If no valid token → authenticate user
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+def _refresh_credentials(creds):
+    """Refreshes or logs in, holding a file lock so workers don't refresh at once."""
+    lock_file = open(TOKEN_FILE + '.lock', 'w')
+    try:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        # Another process may have refreshed while we waited for the lock
+        if os.path.exists(TOKEN_FILE):
+            on_disk = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+            if on_disk.valid:
+                return on_disk
+            creds = creds or on_disk
+
+        if creds and creds.refresh_token:
             # Auto-refresh
             creds.refresh(Request())
         else:
@@ -69,44 +208,125 @@ def get_oauth_credentials():
             creds = flow.run_local_server(port=0)
 
         # Save token for next runs
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
+        _write_token(creds)
+        return creds
+    finally:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
 
-    return creds
+def get_oauth_credentials():
+    """Gets OAuth credentials, refreshes or logs in once. Cached in memory."""
+    global _creds
+    creds = _creds
+    if creds is not None and creds.valid:
+        return creds
 
+    with _creds_lock:
+        if _creds is None and os.path.exists(TOKEN_FILE):
+            _creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
-def upload_to_drive(filepath, filename, mime_type, folder_id=TARGET_FOLDER_ID):
+        if _creds is None or not _creds.valid:
+            refreshed = _refresh_credentials(_creds)
+            if _creds is not None and refreshed is not _creds:
+                # Keep the same object alive: every thread's AuthorizedHttp holds it
+                _creds.token = refreshed.token
+                _creds.expiry = refreshed.expiry
+            else:
+                _creds = refreshed
+
+    return _creds
+
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024       # must be a multiple of 256 KB
+MAX_UPLOAD_RETRIES = 6
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Cap on concurrent uploads. Below it a batch gets one thread per file, so a
+# 20-file job (20 documents + 20 cards) uploads in about the slowest file's time.
+DEFAULT_UPLOAD_WORKERS = 40
+
+
+def _backoff(attempt):
+    """Exponential backoff with jitter: ~1s, 2s, 4s ... capped at 32s."""
+    return min(32, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def _resumable_upload(filepath, filename, mime_type, folder_id, chunk_size=UPLOAD_CHUNK_SIZE):
     """
-    Uploads a file to Google Drive folder using OAuth.
-    Returns: (webViewLink, fileId)
+    Chunked resumable upload. On a 429/5xx or a dropped connection the same
+    request is retried with backoff; next_chunk() then asks Drive how many
+    bytes it committed and continues from there instead of starting over.
     """
-    try:
-        # Authenticate user OAuth
-        creds = get_oauth_credentials()
-        service = build('drive', 'v3', credentials=creds)
+    service = get_drive_service()
+    if isinstance(filepath, (bytes, bytearray)):
+        # In-memory job workspaces hand over the file's bytes instead of a path
+        media = MediaIoBaseUpload(BytesIO(filepath), mimetype=mime_type, resumable=True, chunksize=chunk_size)
+    else:
+        media = MediaFileUpload(filepath, mimetype=mime_type, resumable=True, chunksize=chunk_size)
+    request = service.files().create(
+        body={'name': filename, 'parents': [folder_id]},
+        media_body=media,
+        fields='id, webViewLink'
+    )
 
-        file_metadata = {
-            'name': filename,
-            'parents': [folder_id]
-        }
+    response = None
+    attempt = 0
+    while response is None:
+        try:
+            with timed_drive('upload_chunk'):
+                _, response = request.next_chunk()
+            attempt = 0
+        except HttpError as e:
+            if e.resp.status not in RETRYABLE_STATUSES or attempt >= MAX_UPLOAD_RETRIES:
+                raise
+            attempt += 1
+            log_event('drive_retry', operation='upload', filename=filename, status=e.resp.status,
+                      attempt=attempt, max_attempts=MAX_UPLOAD_RETRIES)
+            time.sleep(_backoff(attempt))
+        except (ConnectionError, TimeoutError, socket.timeout, httplib2.HttpLib2Error) as e:
+            if attempt >= MAX_UPLOAD_RETRIES:
+                raise
+            attempt += 1
+            log_event('drive_retry', operation='upload', filename=filename, error=str(e),
+                      attempt=attempt, max_attempts=MAX_UPLOAD_RETRIES)
+            time.sleep(_backoff(attempt))
+    return response
 
-        media = MediaFileUpload(filepath, resumable=True, mimetype=mime_type)
 
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink'
-        ).execute()
+def upload_to_drive(filepath, filename, mime_type, folder_id=TARGET_FOLDER_ID):
+    """
+    Uploads a file (a path, or the file's bytes) to Google Drive folder using OAuth.
+    Returns: (webViewLink, fileId)
+    """
+    try:
+        with timed_drive('upload'):
+            file = _resumable_upload(filepath, filename, mime_type, folder_id)
 
         file_id = file.get('id')
         web_link = file.get('webViewLink')
 
-        print(f"✅ Drive Upload SUCCESS - {filename}. ID: {file_id}")
+        log_event('drive_upload', filename=filename, file_id=file_id)
         return web_link, file_id
 
     except HttpError as e:
-        print(f"❌ Google Drive API Error (HTTP {e.resp.status}): {e.content}")
+        log_event('drive_error', operation='upload', filename=filename, status=e.resp.status,
+                  error=e.content.decode('utf-8', 'replace') if isinstance(e.content, bytes) else e.content)
         return None, None
     except Exception as e:
-        print(f"❌ Generic Error uploading {filename}: {e}")
+        log_event('drive_error', operation='upload', filename=filename, error=str(e))
         return None, None
+
+
+def upload_many(items, max_workers=DEFAULT_UPLOAD_WORKERS, folder_id=TARGET_FOLDER_ID):
+    """
+    Uploads several files concurrently, one thread per file up to max_workers.
+    items is a list of (filepath or bytes, filename, mime_type); returns a list of
+    (webViewLink, fileId) in the same order, (None, None) for failures.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        futures = [pool.submit(upload_to_drive, filepath, filename, mime_type, folder_id)
+                   for filepath, filename, mime_type in items]
+        return [future.result() for future in futures]
@@ -0,0 +1,308 @@
+import os
+import time
+import shutil
+import socket
+import threading
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from werkzeug.utils import secure_filename
+from app import mongo
+from app.metrics import log_event
+
+ALLOWED_EXTENSIONS = {'.pdf', '.ppt', '.pptx'}
+
+# Job lifecycle: queued -> running -> done | failed
+# Each file inside a job moves through: queued -> running -> done | failed
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def enqueue_upload_job(files, coordinate, semester, branch, spool_dir, user_id=None):
+    """
+    Saves the uploaded files into a per-job spool directory and persists a job
+    document in Mongo. Returns the job id as a string.
+    """
+    job_id = ObjectId()
+    job_dir = os.path.join(spool_dir, str(job_id))
+    os.makedirs(job_dir, exist_ok=True)
+
+    file_entries = []
+    for index, file in enumerate(files):
+        # Prefix with the index so two files with the same name never collide
+        spooled_path = os.path.join(job_dir, f"{index}_{secure_filename(file.filename) or 'upload'}")
+        file.save(spooled_path)
+        file_entries.append({
+            'filename': file.filename,
+            'path': spooled_path,
+            'status': 'queued',
+            'error': None,
+            'summary': None,
+            'glb_key': None,
+            'glb_id': None,
+            'asset_id': None,
+            'duplicate_of': None,
+        })
+
+    now = _now()
+    mongo.db.jobs.insert_one({
+        '_id': job_id,
+        'type': 'upload',
+        'status': 'queued',
+        'coordinate': coordinate,
+        'semester': semester,
+        'branch': branch,
+        'files': file_entries,
+        'total': len(file_entries),
+        'completed': 0,
+        'failed': 0,
+        'spool_dir': job_dir,
+        'created_by': user_id,
+        'created_at': now,
+        'updated_at': now,
+        'heartbeat_at': None,
+        'worker': None,
+    })
+    return str(job_id)
+
+
+def get_job_status(job_id):
+    """Returns a JSON-friendly view of a job, or None if it does not exist."""
+    try:
+        job = mongo.db.jobs.find_one({'_id': ObjectId(job_id)}, {'spool_dir': 0})
+    except Exception:
+        return None
+    if not job:
+        return None
+
+    return {
+        'id': str(job['_id']),
+        'status': job['status'],
+        'total': job['total'],
+        'completed': job['completed'],
+        'failed': job['failed'],
+        'files': [
+            {
+                'filename': f['filename'],
+                'status': f['status'],
+                'error': f['error'],
+                'summary': f['summary'],
+                'glb_key': f.get('glb_key'),
+                'glb_id': f['glb_id'],
+                'duplicate_of': f.get('duplicate_of'),
+            }
+            for f in job['files']
+        ],
+    }
+
+
+def claim_next_job(worker_name, lease_seconds):
+    """
+    Atomically claims the oldest queued job. Jobs whose worker stopped sending
+    heartbeats for longer than the lease are picked up again.
+    """
+    now = _now()
+    stale_before = now - timedelta(seconds=lease_seconds)
+    return mongo.db.jobs.find_one_and_update(
+        {'$or': [
+            {'status': 'queued'},
+            {'status': 'running', 'heartbeat_at': {'$lt': stale_before}},
+        ]},
+        {'$set': {'status': 'running', 'worker': worker_name, 'heartbeat_at': now, 'updated_at': now}},
+        sort=[('created_at', 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+class LeaseLost(Exception):
+    """The job was handed to another worker; this one must stop writing to it."""
+
+
+def renew_lease(db, job_id, worker_name):
+    """Pushes the heartbeat forward. False if the job no longer belongs to worker_name."""
+    now = _now()
+    result = db.jobs.update_one({'_id': job_id, 'worker': worker_name, 'status': 'running'},
+                                {'$set': {'heartbeat_at': now}})
+    return result.matched_count == 1
+
+
+class JobHeartbeat:
+    """
+    Renews a claimed job's lease from a background thread for as long as the
+    job runs, so one long pipeline batch never looks like a dead worker.
+    """
+
+    def __init__(self, db, job_id, worker_name, lease_seconds):
+        self.db = db
+        self.job_id = job_id
+        self.worker_name = worker_name
+        # Several renewals per lease, so one slow Mongo call doesn't lose it
+        self.interval = max(1.0, lease_seconds / 4)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not renew_lease(self.db, self.job_id, self.worker_name):
+                    self.lost = True
+                    log_event('lease_lost', job_id=self.job_id, worker=self.worker_name)
+                    return
+            except Exception as e:
+                log_event('heartbeat_failed', job_id=self.job_id, worker=self.worker_name, error=str(e))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def _update_file(job_id, worker_name, index, fields):
+    """Records one file's progress. Raises LeaseLost if the job was reclaimed."""
+    now = _now()
+    update = {'$set': {f'files.{index}.{key}': value for key, value in fields.items()}}
+    update['$set'].update({'heartbeat_at': now, 'updated_at': now})
+    if fields.get('status') == 'done':
+        update['$inc'] = {'completed': 1}
+    elif fields.get('status') == 'failed':
+        update['$inc'] = {'failed': 1}
+    result = mongo.db.jobs.update_one({'_id': job_id, 'worker': worker_name}, update)
+    if result.matched_count != 1:
+        raise LeaseLost(f"Job {job_id} was reclaimed from {worker_name}.")
+
+
+def run_job(job, batch_size, summary_mode, upload_workers, extract_workers,
+            workspace_root=None, workspace_in_memory=False, lease_seconds=900):
+    """
+    Processes every file of a claimed job and records per-file progress.
+    The lease is renewed in the background while the job runs; if it is lost
+    anyway, LeaseLost is raised and nothing more is written to the job.
+    """
+    # Imported here so the web process never pulls in the model stack
+    from app.services.pipeline import process_files
+    from app.services.workspace import JobWorkspace
+
+    # A reclaimed job skips the files a previous worker already finished
+    pending = [(index, entry['path'], entry['filename'])
+               for index, entry in enumerate(job['files'])
+               if entry['status'] not in ('done', 'failed')]
+
+    worker_name = job['worker']
+    for index, _, _ in pending:
+        _update_file(job['_id'], worker_name, index, {'status': 'running'})
+
+    # Everything the pipeline generates stays in a directory no other job can see
+    with JobHeartbeat(mongo.db, job['_id'], worker_name, lease_seconds) as heartbeat, \
+            JobWorkspace(job['_id'], root=workspace_root, in_memory=workspace_in_memory) as workspace:
+        for index, result, error in process_files(pending, job['coordinate'], job['semester'],
+                                                  job['branch'], mongo.db, batch_size=batch_size,
+                                                  summary_mode=summary_mode,
+                                                  upload_workers=upload_workers,
+                                                  extract_workers=extract_workers,
+                                                  workspace=workspace):
+            if heartbeat.lost:
+                raise LeaseLost(f"Job {job['_id']} was reclaimed from {worker_name}.")
+            if error:
+                log_event('job_file_failed', job_id=job['_id'], worker=worker_name,
+                          filename=job['files'][index]['filename'], error=str(error))
+                _update_file(job['_id'], worker_name, index, {'status': 'failed', 'error': str(error)})
+            else:
+                _update_file(job['_id'], worker_name, index, {'status': 'done', **result})
+
+    job = mongo.db.jobs.find_one({'_id': job['_id']}, {'failed': 1, 'total': 1, 'spool_dir': 1})
+    final_status = 'failed' if job['failed'] == job['total'] else 'done'
+    # Only the worker holding the lease may close the job
+    result = mongo.db.jobs.update_one({'_id': job['_id'], 'worker': worker_name},
+                                      {'$set': {'status': final_status, 'updated_at': _now()}})
+    if result.matched_count != 1:
+        raise LeaseLost(f"Job {job['_id']} was reclaimed from {worker_name}.")
+    shutil.rmtree(job['spool_dir'], ignore_errors=True)
+
+
+def fail_job(job_id, worker_name, error):
+    """
+    Closes a job that crashed as a whole: every file that hadn't finished is
+    marked failed with the error and counted, and the spool is removed.
+    Nothing is written if the job was reclaimed by another worker.
+    """
+    job = None
+    try:
+        job = mongo.db.jobs.find_one({'_id': job_id, 'worker': worker_name},
+                                     {'files.status': 1, 'spool_dir': 1})
+        if job is None:
+            return
+        update = {'status': 'failed', 'updated_at': _now()}
+        unfinished = 0
+        for index, entry in enumerate(job['files']):
+            if entry['status'] not in ('done', 'failed'):
+                update[f'files.{index}.status'] = 'failed'
+                update[f'files.{index}.error'] = str(error)
+                unfinished += 1
+        mongo.db.jobs.update_one({'_id': job_id, 'worker': worker_name},
+                                 {'$set': update, '$inc': {'failed': unfinished}})
+    finally:
+        if job is not None:
+            shutil.rmtree(job['spool_dir'], ignore_errors=True)
+
+
+def run_worker(worker_name, poll_interval, lease_seconds, batch_size, summary_mode,
+               upload_workers, extract_workers, workspace_root=None, workspace_in_memory=False):
+    """Drains the job queue forever. Must be called inside an app context."""
+    log_event('worker_started', worker=worker_name)
+    while True:
+        job = claim_next_job(worker_name, lease_seconds)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        log_event('job_claimed', job_id=job['_id'], worker=worker_name, files=job['total'])
+        try:
+            run_job(job, batch_size, summary_mode, upload_workers, extract_workers,
+                    workspace_root, workspace_in_memory, lease_seconds)
+        except LeaseLost as e:
+            # The new owner finishes the job; don't touch it
+            log_event('lease_lost', job_id=job['_id'], worker=worker_name, error=str(e))
+        except Exception as e:
+            log_event('job_crashed', job_id=job['_id'], worker=worker_name, error=str(e))
+            fail_job(job['_id'], worker_name, e)
+
+
+def _worker_main(worker_name):
+    # Each process builds its own app (and its own Mongo client) after the spawn
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        run_worker(worker_name,
+                   app.config['JOB_POLL_INTERVAL'],
+                   app.config['JOB_LEASE_SECONDS'],
+                   app.config['SUMMARY_BATCH_SIZE'],
+                   app.config['SUMMARY_MODE'],
+                   app.config['DRIVE_UPLOAD_WORKERS'],
+                   app.config['EXTRACT_WORKERS'],
+                   app.config['WORKSPACE_ROOT'],
+                   app.config['WORKSPACE_IN_MEMORY'])
+
+
+def start_worker_pool(num_workers):
+    """Starts num_workers local worker processes and waits on them."""
+    # 'spawn' keeps torch and the Mongo client out of a forked parent state
+    ctx = multiprocessing.get_context('spawn')
+    host = socket.gethostname()
+    processes = []
+    for i in range(num_workers):
+        p = ctx.Process(target=_worker_main, args=(f"{host}-{os.getpid()}-{i}",), daemon=False)
+        p.start()
+        processes.append(p)
+
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.terminate()
@@ -0,0 +1,146 @@
+import json
+import gzip
+import time
+from contextlib import contextmanager
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+try:
+    import zstandard  # Optional: smaller and faster than gzip when the client accepts it
+except ImportError:
+    zstandard = None
+
+# Every asset write takes the next value of this counter as the asset's
+# 'version', so "what changed since version N" is a single indexed range query.
+COUNTER_ID = 'assets'
+# Versions are handed out before the write that uses them is saved, so
+# version 11 can be visible while 10 is still being written. Each write keeps
+# its first version in the counter's 'pending' map until it is done, and readers
+# only go up to the version below the oldest pending one. A pending entry
+# older than this (its process died) no longer holds readers back.
+RESERVATION_SECONDS = 300
+
+ASSET_FIELDS = {'filename': 1, 'semester': 1, 'semester_num': 1, 'branch': 1,
+                'summary': 1, 'pdf_key': 1, 'pdf_url': 1, 'glb_key': 1, 'glb_id': 1,
+                'thumbnail_key': 1, 'version': 1}
+
+
+def _reserve(db, count):
+    """Takes count versions and marks them pending. Returns (token, first, last)."""
+    token = str(ObjectId())
+    # One atomic update: the second stage of the pipeline sees the new seq.
+    # A missing counter, or one without seq, starts from 0.
+    update = [
+        {'$set': {'seq': {'$add': [{'$ifNull': ['$seq', 0]}, count]}}},
+        {'$set': {f'pending.{token}': {'first': {'$subtract': ['$seq', count - 1]}, 'at': time.time()}}},
+    ]
+    try:
+        doc = db.counters.find_one_and_update({'_id': COUNTER_ID}, update, projection={'seq': 1},
+                                              upsert=True, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        # Lost the race to create the counter; it exists now
+        doc = db.counters.find_one_and_update({'_id': COUNTER_ID}, update, projection={'seq': 1},
+                                              upsert=True, return_document=ReturnDocument.AFTER)
+    return token, doc['seq'] - count + 1, doc['seq']
+
+
+@contextmanager
+def reserve_versions(db, count=1):
+    """
+    Reserves count consecutive versions for one write and yields the last.
+    Readers see none of them until the with block is done.
+    """
+    token, _, last = _reserve(db, count)
+    try:
+        yield last
+    finally:
+        doc = db.counters.find_one_and_update({'_id': COUNTER_ID}, {'$unset': {f'pending.{token}': ''}},
+                                              projection={'pending': 1}, return_document=ReturnDocument.AFTER)
+        # Entries left behind by processes that died
+        cutoff = time.time() - RESERVATION_SECONDS
+        expired = [key for key, entry in (doc or {}).get('pending', {}).items() if entry['at'] < cutoff]
+        if expired:
+            db.counters.update_one({'_id': COUNTER_ID}, {'$unset': {f'pending.{key}': '' for key in expired}})
+
+
+def committed_version(db):
+    """Highest version every write up to which has finished."""
+    doc = db.counters.find_one({'_id': COUNTER_ID}) or {}
+    cutoff = time.time() - RESERVATION_SECONDS
+    pending = [entry['first'] for entry in doc.get('pending', {}).values() if entry['at'] >= cutoff]
+    return min(pending) - 1 if pending else doc.get('seq', 0)
+
+
+def backfill_versions(db, batch_size=1000):
+    """Gives a version to assets saved before versions existed. Returns how many."""
+    ids = [doc['_id'] for doc in db.assets.find({'version': {'$exists': False}}, {'_id': 1}).sort('_id', 1)]
+    if not ids:
+        return 0
+    with reserve_versions(db, len(ids)) as last:
+        first = last - len(ids) + 1
+        for start in range(0, len(ids), batch_size):
+            for offset, asset_id in enumerate(ids[start:start + batch_size], start):
+                db.assets.update_one({'_id': asset_id}, {'$set': {'version': first + offset}})
+    return len(ids)
+
+
+def manifest_version(db, college):
+    """
+    Newest version touching the college: its latest asset or its last edit,
+    capped at committed_version so no write still in progress is skipped.
+    """
+    committed = committed_version(db)
+    latest = db.assets.find_one({'coordinate_norm': college.get('coordinate_norm'),
+                                 'version': {'$lte': committed}},
+                                {'version': 1}, sort=[('version', -1)])
+    return min(max((latest or {}).get('version', 0), college.get('manifest_reset', 0)), committed)
+
+
+def build_manifest(db, college, version, since=None, asset_json=None):
+    """
+    Full manifest, or only the assets changed after `since`. A college edit
+    (e.g. a moved coordinate) can drop assets, so a client older than the
+    last edit gets a full manifest and has to replace its copy. Assets newer
+    than `version` are left for the next sync.
+    """
+    full = since is None or since < college.get('manifest_reset', 0)
+    query = {'coordinate_norm': college.get('coordinate_norm')}
+    if full:
+        # Assets saved before versions existed have none and always belong in a full manifest
+        query['version'] = {'$not': {'$gt': version}}
+    else:
+        query['version'] = {'$gt': since, '$lte': version}
+
+    assets = db.assets.find(query, ASSET_FIELDS).sort('version', 1)
+    return {
+        'college': {'id': str(college['_id']), 'name': college.get('college_name')},
+        'version': version,
+        'since': None if full else since,
+        'full': full,
+        'assets': [asset_json(a) if asset_json else a for a in assets],
+    }
+
+
+def manifest_etag(college, version, since, encoding):
+    # Strong ETag: the body is fully determined by these, including its encoding
+    return f"{college['_id']}-{version}-{since if since is not None else 'full'}-{encoding or 'identity'}"
+
+
+def negotiate_encoding(accept_encoding):
+    """zstd if available and accepted, then gzip, else None (identity)."""
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if zstandard is not None and 'zstd' in accepted:
+        return 'zstd'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def encode_manifest(manifest, encoding):
+    body = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
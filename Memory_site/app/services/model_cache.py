@@ -0,0 +1,258 @@
+import os
+import re
+import hashlib
+import tempfile
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from flask import current_app, send_file, request, Response
+from app.metrics import count_cache
+
+# Drive ids are url-safe; anything else never touches the filesystem
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def is_safe_id(file_id):
+    return bool(_SAFE_ID.match(file_id))
+
+
+def range_not_satisfiable(size, etag=None):
+    """
+    416 response when the request's single Range lies entirely past the end
+    of a size-byte file, else None. Multi-range requests are left alone
+    (they get the whole file), as are requests answered with a 304.
+    """
+    byte_range = request.range
+    if byte_range is None or len(byte_range.ranges) != 1 or (etag and etag in request.if_none_match):
+        return None
+    if byte_range.range_for_length(size) is not None:
+        return None
+    response = Response(status=416)
+    response.headers['Content-Range'] = f'bytes */{size}'
+    return response
+
+
+class CachedModel:
+    """A cached GLB, backed either by bytes in memory or by a file on disk."""
+
+    def __init__(self, etag, size, path=None, data=None):
+        self.etag = etag
+        self.size = size
+        self.path = path
+        self.data = data
+
+    def send(self, download_name, mimetype='model/gltf-binary', max_age=0):
+        """
+        Serves the model with ETag/If-None-Match, Range and Cache-Control
+        handled by werkzeug. Disk entries go out as real files, so the
+        WSGI server can use sendfile instead of copying through Python.
+        """
+        unsatisfiable = range_not_satisfiable(self.size, self.etag)
+        if unsatisfiable is not None:
+            return unsatisfiable
+        source = self.path if self.path is not None else BytesIO(self.data)
+        response = send_file(
+            source,
+            mimetype=mimetype,
+            as_attachment=False,
+            download_name=download_name,
+            etag=self.etag,
+            conditional=True,
+            max_age=max_age
+        )
+        # Drive ids never change content, so clients may keep them forever
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+class ModelCache:
+    """
+    Two-tier, size-bounded cache of Drive files:
+    a small in-memory LRU for hot, small models and an on-disk LRU for the rest.
+    """
+
+    def __init__(self, cache_dir, disk_max_bytes, memory_max_bytes, memory_item_max_bytes):
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_item_max_bytes = memory_item_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # file_id -> size of what is on disk, least recently used first. Every
+        # worker process writes to the same directory, so it is rebuilt from a
+        # scan before each eviction: the bound is for all of them together.
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    def _paths(self, file_id):
+        base = os.path.join(self.cache_dir, file_id)
+        return base, base + '.etag'
+
+    def get(self, file_id):
+        if not is_safe_id(file_id):
+            return None
+
+        with self._lock:
+            entry = self._memory.get(file_id)
+            if entry is not None:
+                self._memory.move_to_end(file_id)
+                self.hits['memory'] += 1
+                count_cache('model', 'memory_hit')
+                return entry
+
+        data_path, etag_path = self._paths(file_id)
+        try:
+            with open(etag_path) as f:
+                etag = f.read().strip()
+            size = os.path.getsize(data_path)
+            # Touch it so disk eviction is least-recently-used, not least-recently-written
+            os.utime(data_path)
+        except OSError:
+            self.misses += 1
+            count_cache('model', 'miss')
+            return None
+
+        self.hits['disk'] += 1
+        count_cache('model', 'disk_hit')
+        # Files another process cached are picked up here
+        self._track_disk(file_id, size)
+        entry = CachedModel(etag, size, path=os.path.abspath(data_path))
+        if size <= self.memory_item_max_bytes:
+            with open(data_path, 'rb') as f:
+                self._remember(file_id, CachedModel(etag, size, data=f.read()))
+        return entry
+
+    def put(self, file_id, file_obj, etag=None):
+        """Stores a downloaded file (any readable binary stream) and returns its entry."""
+        writer = self.open_writer(file_id, etag=etag)
+        try:
+            for block in iter(lambda: file_obj.read(1024 * 1024), b''):
+                writer.write(block)
+            return writer.commit()
+        finally:
+            writer.abort()
+
+    def open_writer(self, file_id, etag=None):
+        """
+        Incremental writer, so a download can be cached while it is being
+        streamed to the client. Nothing becomes visible until commit().
+        """
+        if not is_safe_id(file_id):
+            raise ValueError(f"Refusing to cache unsafe file id {file_id!r}")
+        return CacheWriter(self, file_id, etag)
+
+    def _committed(self, file_id, data_path, etag, size):
+        # Commits only follow a full download, so the scan is cheap next to it
+        self._scan_disk()
+        self._evict_disk()
+        entry = CachedModel(etag, size, path=os.path.abspath(data_path))
+        if size <= self.memory_item_max_bytes:
+            with open(data_path, 'rb') as f:
+                self._remember(file_id, CachedModel(etag, size, data=f.read()))
+        return entry
+
+    def _remember(self, file_id, entry):
+        with self._lock:
+            previous = self._memory.pop(file_id, None)
+            if previous is not None:
+                self._memory_bytes -= previous.size
+            self._memory[file_id] = entry
+            self._memory_bytes += entry.size
+            while self._memory_bytes > self.memory_max_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.size
+
+    def _scan_disk(self):
+        entries = []
+        for item in os.scandir(self.cache_dir):
+            if item.is_file() and not item.name.endswith('.etag') and not item.name.startswith('.'):
+                try:
+                    stat = item.stat()
+                except OSError:
+                    # Evicted by another process since the listing
+                    continue
+                entries.append((stat.st_mtime, item.name, stat.st_size))
+        with self._lock:
+            self._disk.clear()
+            # Oldest-used first
+            for _, file_id, size in sorted(entries):
+                self._disk[file_id] = size
+            self._disk_bytes = sum(self._disk.values())
+
+    def _track_disk(self, file_id, size):
+        with self._lock:
+            self._disk_bytes += size - self._disk.pop(file_id, 0)
+            self._disk[file_id] = size
+
+    def _evict_disk(self):
+        with self._lock:
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                file_id, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                for victim in self._paths(file_id):
+                    try:
+                        os.remove(victim)
+                    except OSError:
+                        pass
+
+
+class CacheWriter:
+    def __init__(self, cache, file_id, etag=None):
+        self.cache = cache
+        self.file_id = file_id
+        self.etag = etag
+        self.size = 0
+        self._digest = hashlib.sha256()
+        # Write to a temp file and rename, so readers never see a partial model
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.cache_dir, prefix='.partial-')
+        self._out = os.fdopen(fd, 'wb')
+
+    def write(self, block):
+        self._digest.update(block)
+        self._out.write(block)
+        self.size += len(block)
+
+    def commit(self):
+        self._out.close()
+        data_path, etag_path = self.cache._paths(self.file_id)
+        etag = self.etag or self._digest.hexdigest()[:32]
+        with open(etag_path, 'w') as f:
+            f.write(etag)
+        os.replace(self._tmp_path, data_path)
+        self._tmp_path = None
+        return self.cache._committed(self.file_id, data_path, etag, self.size)
+
+    def abort(self):
+        """Drops an unfinished download. Safe to call after commit()."""
+        if self._tmp_path is None:
+            return
+        self._out.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        self._tmp_path = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache():
+    """Process-wide cache configured from the app config."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = current_app.config
+                _cache = ModelCache(
+                    config['MODEL_CACHE_DIR'],
+                    config['MODEL_CACHE_DISK_BYTES'],
+                    config['MODEL_CACHE_MEMORY_BYTES'],
+                    config['MODEL_CACHE_MEMORY_ITEM_BYTES'],
+                )
+    return _cache
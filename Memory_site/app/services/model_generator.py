@@ -1,100 +1,325 @@
 import os
-import trimesh
-import numpy as np
+import json
+import struct
+from io import BytesIO
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from app.metrics import log_event
 
-def create_text_texture(text, output_path, image_size=(1024, 614), bg_color='black', text_color='white'):
+# --- Text textures ---
+# Fonts are loaded once per (path, size), text is wrapped by measured glyph
+# widths and the font size is binary-searched so the summary fills the card.
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TASAExplorer-Medium.ttf')
+TEXTURE_SIZE = (1024, 614)
+TEXTURE_PADDING = 48
+MIN_FONT_SIZE, MAX_FONT_SIZE = 14, 96
+LINE_SPACING = 0.25  # extra space between lines, as a fraction of the font size
+
+# 'png', 'jpeg' or 'webp' (webp cards use the EXT_texture_webp glTF extension)
+CARD_TEXTURE_FORMAT = 'png'
+# Cards use the largest mip level no wider than this
+CARD_TEXTURE_MAX_WIDTH = TEXTURE_SIZE[0]
+
+TEXTURE_FORMATS = {
+    'png': ('PNG', 'image/png', {'optimize': True}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 85, 'method': 4}),
+}
+
+
+def init_app(app):
+    """FONT_PATH, CARD_TEXTURE_FORMAT and CARD_TEXTURE_MAX_WIDTH come from the app config."""
+    global FONT_PATH, CARD_TEXTURE_FORMAT, CARD_TEXTURE_MAX_WIDTH
+    FONT_PATH = app.config['CARD_FONT']
+    CARD_TEXTURE_FORMAT = app.config['CARD_TEXTURE_FORMAT'].lower()
+    CARD_TEXTURE_MAX_WIDTH = app.config['CARD_TEXTURE_MAX_WIDTH']
+    # Layouts were measured with the previous font
+    load_font.cache_clear()
+    layout_text.cache_clear()
+
+
+@lru_cache(maxsize=64)
+def load_font(size, path=None):
+    path = path or FONT_PATH
+    try:
+        return ImageFont.truetype(path, size=size)
+    except IOError:
+        log_event('font_missing', path=path)
+        return ImageFont.load_default(size=size)
+
+
+def wrap_text(text, font, max_width):
+    """Greedy word wrap by measured width. Words wider than a line are split."""
+    space = font.getlength(" ")
+    widths = {}
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            if word not in widths:
+                widths[word] = font.getlength(word)
+            width = widths[word]
+            while width > max_width and len(word) > 1:
+                # Break an overlong word at the last character that still fits
+                cut = len(word) - 1
+                while cut > 1 and font.getlength(word[:cut]) > max_width:
+                    cut -= 1
+                if line:
+                    lines.append(" ".join(line))
+                    line, line_width = [], 0.0
+                lines.append(word[:cut])
+                word = word[cut:]
+                width = font.getlength(word)
+            needed = width if not line else line_width + space + width
+            if line and needed > max_width:
+                lines.append(" ".join(line))
+                line, line_width = [word], width
+            else:
+                line.append(word)
+                line_width = needed
+        lines.append(" ".join(line))
+    return lines
+
+
+def _line_height(font, size):
+    ascent, descent = font.getmetrics()
+    return ascent + descent + int(size * LINE_SPACING)
+
+
+@lru_cache(maxsize=256)
+def layout_text(text, image_size=TEXTURE_SIZE, padding=TEXTURE_PADDING):
     """
-    Creates a PNG texture image with robust text wrapping.
+    Returns (font_size, lines): the largest font size whose wrapped text fits
+    inside the padded card, found by binary search over the size.
     """
+    max_width = image_size[0] - 2 * padding
+    max_height = image_size[1] - 2 * padding
+
+    best = (MIN_FONT_SIZE, wrap_text(text, load_font(MIN_FONT_SIZE), max_width))
+    low, high = MIN_FONT_SIZE + 1, MAX_FONT_SIZE
+    while low <= high:
+        size = (low + high) // 2
+        font = load_font(size)
+        lines = wrap_text(text, font, max_width)
+        if len(lines) * _line_height(font, size) <= max_height:
+            best = (size, lines)
+            low = size + 1
+        else:
+            high = size - 1
+    return best
+
+
+def render_text_texture(text, image_size=TEXTURE_SIZE, bg_color='black', text_color='white'):
+    """Draws the text centred on the card and returns the PIL image."""
+    size, lines = layout_text(text, tuple(image_size))
+    font = load_font(size)
+    line_height = _line_height(font, size)
+
     img = Image.new('RGB', image_size, color=bg_color)
     draw = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("arial.ttf", size=45)
-    except IOError:
-        font = ImageFont.load_default()
-    wrapper = textwrap.TextWrapper(width=40, break_long_words=True)
-    wrapped_text = "\n".join(wrapper.wrap(text))
-    _, _, text_width, text_height = draw.multiline_textbbox((0, 0), wrapped_text, font=font, spacing=10)
-    text_x = (image_size[0] - text_width) / 2
-    text_y = (image_size[1] - text_height) / 2
-    draw.multiline_text(
-        (text_x, text_y),
-        wrapped_text,
-        font=font,
-        fill=text_color,
-        align="center",
-        spacing=10
-    )
-    img.save(output_path)
-    print(f"Texture image saved to {output_path}")
-
-# --- START OF THE FINAL generate_3d_card FUNCTION ---
-def generate_3d_card(texture_path, output_glb_path):
+    y = (image_size[1] - len(lines) * line_height) / 2
+    for line in lines:
+        x = (image_size[0] - font.getlength(line)) / 2
+        draw.text((x, y), line, font=font, fill=text_color)
+        y += line_height
+    return img
+
+
+def texture_mips(img, min_width=128):
+    """Yields the image and successively half-sized copies down to min_width."""
+    while True:
+        yield img
+        if img.width // 2 < min_width:
+            return
+        img = img.resize((img.width // 2, max(1, img.height // 2)), Image.LANCZOS)
+
+
+def encode_texture(img, texture_format='png'):
+    """Encodes a PIL image into memory. Returns (bytes, mime_type)."""
+    if texture_format not in TEXTURE_FORMATS:
+        raise ValueError(f"Unknown texture format '{texture_format}'. "
+                         f"Choose one of: {', '.join(sorted(TEXTURE_FORMATS))}")
+    pil_format, mime_type, options = TEXTURE_FORMATS[texture_format]
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue(), mime_type
+
+
+def card_texture(text, texture_format=None, max_width=None):
+    """Rendered + encoded texture for a card. Returns (bytes, mime_type)."""
+    max_width = max_width or CARD_TEXTURE_MAX_WIDTH
+    img = render_text_texture(text)
+    for level in texture_mips(img, min_width=1):
+        if level.width <= max_width:
+            img = level
+            break
+    return encode_texture(img, texture_format or CARD_TEXTURE_FORMAT)
+
+
+def create_text_texture(text, output_path=None, image_size=TEXTURE_SIZE, bg_color='black',
+                        text_color='white', texture_format='png'):
     """
-    Final, robust function to generate a 3D card with text on the front face.
-    This version uses explicit orientation and detailed logging.
+    Creates a texture image with the text fitted to the card.
+    Returns the encoded bytes, and also saves them when output_path is given.
     """
-    print("\n--- Running FINAL, ROBUST generate_3d_card function ---")
-    if not os.path.exists(texture_path):
-        print(f"Error: Texture file not found at {texture_path}")
-        return
+    img = render_text_texture(text, image_size, bg_color, text_color)
+    data, _ = encode_texture(img, texture_format)
+    if output_path:
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        log_event('texture_saved', path=output_path)
+    return data
 
-    # 1. Create a box with specific dimensions (X=width, Y=height, Z=thickness)
-    card_extents = [8.56, 5.4, 0.076]
-    card_mesh = trimesh.creation.box(extents=card_extents)
-    print(f"Step 1: Created box with {len(card_mesh.vertices)} vertices and {len(card_mesh.faces)} faces.")
+# --- Card template ---
+# The card geometry never changes, only its texture. The mesh, its UVs and the
+# geometry part of the GLB binary chunk are built once per process; producing a
+# card is then just appending the encoded texture and patching two lengths.
 
-    # 2. Load the texture
-    texture_img = Image.open(texture_path).convert("RGBA")
+CARD_EXTENTS = [8.56, 5.4, 0.076]
 
-    # 3. Initialize UV coordinates for all vertices to a safe default (a single point)
-    uv = np.zeros((len(card_mesh.vertices), 2))
+GLB_MAGIC = 0x46546C67      # 'glTF'
+CHUNK_JSON = 0x4E4F534A     # 'JSON'
+CHUNK_BIN = 0x004E4942      # 'BIN\0'
+FLOAT, UNSIGNED_INT = 5126, 5125
 
-    # 4. Identify the front face. With our extents, the large flat faces are on the Z-axis.
-    # The "front" face will have a normal vector of [0, 0, 1] (pointing along +Z).
-    front_normal = np.array([0, 0, 1])
-    face_indices = np.where(np.all(np.abs(card_mesh.face_normals - front_normal) < 1e-6, axis=1))[0]
 
-    if not face_indices.size:
-        print("FATAL: Could not identify the front face (+Z) of the card. Aborting UV mapping.")
-        return
+def _pad4(data, fill=b'\x00'):
+    return data + fill * (-len(data) % 4)
+
+
+class CardTemplate:
+    """Pre-serialized card mesh: geometry bytes plus a glTF JSON skeleton."""
+
+    def __init__(self, extents=CARD_EXTENTS):
+        # Only the pipeline side builds meshes; the web app just loads the settings
+        import trimesh
+        import numpy as np
+
+        # 1. Box geometry (X=width, Y=height, Z=thickness)
+        card_mesh = trimesh.creation.box(extents=extents)
+        vertices = np.asarray(card_mesh.vertices, dtype=np.float32)
+        faces = np.asarray(card_mesh.faces, dtype=np.uint32)
+
+        # 2. Front face (+Z normal) gets a 0..1 UV mapping over its bounding box,
+        # every other vertex stays at (0, 0) like before
+        front_faces = np.all(np.abs(card_mesh.face_normals - [0, 0, 1]) < 1e-6, axis=1)
+        front_vertices = np.unique(faces[front_faces])
+        if not front_vertices.size:
+            raise ValueError("Could not identify the front face (+Z) of the card.")
+        uv = np.zeros((len(vertices), 2), dtype=np.float32)
+        front_xy = vertices[front_vertices, :2]
+        mins = front_xy.min(axis=0)
+        uv[front_vertices] = (front_xy - mins) / (front_xy.max(axis=0) - mins)
+        # glTF puts the UV origin at the top-left of the image
+        uv[:, 1] = 1.0 - uv[:, 1]
+
+        indices_bytes = faces.reshape(-1).tobytes()
+        positions_bytes = vertices.tobytes()
+        uv_bytes = uv.tobytes()
+        self.geometry = indices_bytes + positions_bytes + uv_bytes
+        self.image_offset = len(self.geometry)
+
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "Memory_site card template"},
+            "scene": 0,
+            "scenes": [{"nodes": [0]}],
+            "nodes": [{"name": "card", "mesh": 0}],
+            "meshes": [{"name": "card", "primitives": [{
+                "attributes": {"POSITION": 1, "TEXCOORD_0": 2},
+                "indices": 0, "mode": 4, "material": 0}]}],
+            # Same material values the trimesh export produced
+            "materials": [{"pbrMetallicRoughness": {
+                "baseColorTexture": {"index": 0},
+                "baseColorFactor": [0.4, 0.4, 0.4, 1.0],
+                "roughnessFactor": 0.9036020036098448}, "doubleSided": False}],
+            "textures": [{"source": 0}],
+            "images": [{"bufferView": 3, "mimeType": "image/png"}],
+            "accessors": [
+                {"bufferView": 0, "componentType": UNSIGNED_INT, "type": "SCALAR",
+                 "count": int(faces.size), "min": [int(faces.min())], "max": [int(faces.max())]},
+                {"bufferView": 1, "componentType": FLOAT, "type": "VEC3", "count": len(vertices),
+                 "min": vertices.min(axis=0).tolist(), "max": vertices.max(axis=0).tolist()},
+                {"bufferView": 2, "componentType": FLOAT, "type": "VEC2", "count": len(uv),
+                 "min": uv.min(axis=0).tolist(), "max": uv.max(axis=0).tolist()},
+            ],
+            "bufferViews": [
+                {"buffer": 0, "byteOffset": 0, "byteLength": len(indices_bytes)},
+                {"buffer": 0, "byteOffset": len(indices_bytes), "byteLength": len(positions_bytes)},
+                {"buffer": 0, "byteOffset": len(indices_bytes) + len(positions_bytes),
+                 "byteLength": len(uv_bytes)},
+                {"buffer": 0, "byteOffset": self.image_offset, "byteLength": 0},
+            ],
+            "buffers": [{"byteLength": 0}],
+        }
+
+    def build(self, image_bytes, mime_type="image/png"):
+        """Splices an encoded texture into the template and returns the GLB bytes."""
+        binary = _pad4(self.geometry + image_bytes)
+
+        gltf = dict(self.gltf)
+        gltf["bufferViews"] = self.gltf["bufferViews"][:3] + [
+            {"buffer": 0, "byteOffset": self.image_offset, "byteLength": len(image_bytes)}]
+        gltf["buffers"] = [{"byteLength": len(binary)}]
+        gltf["images"] = [{"bufferView": 3, "mimeType": mime_type}]
+        if mime_type == "image/webp":
+            # WebP isn't a core glTF image type; model-viewer/three.js read it via this extension
+            gltf["textures"] = [{"extensions": {"EXT_texture_webp": {"source": 0}}}]
+            gltf["extensionsUsed"] = gltf["extensionsRequired"] = ["EXT_texture_webp"]
+        json_chunk = _pad4(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
 
-    print(f"Step 2: Identified front face (normal ~{front_normal}) with face indices: {face_indices}")
+        total = 12 + 8 + len(json_chunk) + 8 + len(binary)
+        return b''.join((
+            struct.pack('<III', GLB_MAGIC, 2, total),
+            struct.pack('<II', len(json_chunk), CHUNK_JSON), json_chunk,
+            struct.pack('<II', len(binary), CHUNK_BIN), binary,
+        ))
 
-    # 5. Get the 4 unique vertices that make up this face
-    vert_indices = np.unique(card_mesh.faces[face_indices])
-    print(f"Step 3: Found {len(vert_indices)} unique vertices for this face: {vert_indices}")
 
-    # 6. Calculate the bounding box and ranges for the front face vertices
-    active_vertices = card_mesh.vertices[vert_indices]
-    min_x, max_x = active_vertices[:, 0].min(), active_vertices[:, 0].max()
-    min_y, max_y = active_vertices[:, 1].min(), active_vertices[:, 1].max()
-    range_x = max_x - min_x
-    range_y = max_y - min_y
-    print(f"Step 4: Calculated bounding box for face: X range={range_x}, Y range={range_y}")
+_template = None
 
-    if range_x < 1e-6 or range_y < 1e-6:
-        print("FATAL: Front face has zero area. Cannot map texture.")
+
+def get_card_template():
+    global _template
+    if _template is None:
+        _template = CardTemplate()
+    return _template
+
+
+def _image_mime_type(image_bytes):
+    if image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "image/png"
+    if image_bytes.startswith(b'\xff\xd8'):
+        return "image/jpeg"
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return "image/webp"
+    return None
+
+
+def build_card_glb(texture_bytes, mime_type=None):
+    """
+    Returns the GLB bytes of a card showing texture_bytes on its front face.
+    PNG, JPEG and WebP textures are embedded as-is; anything else is re-encoded to PNG.
+    """
+    mime_type = mime_type or _image_mime_type(texture_bytes)
+    if mime_type is None:
+        buffer = BytesIO()
+        Image.open(BytesIO(texture_bytes)).convert("RGBA").save(buffer, format="PNG")
+        texture_bytes, mime_type = buffer.getvalue(), "image/png"
+    return get_card_template().build(texture_bytes, mime_type)
+
+
+def generate_3d_card(texture_path, output_glb_path):
+    """
+    Generates a 3D card with the texture on the front face from the cached
+    card template, and writes it to output_glb_path.
+    """
+    if not os.path.exists(texture_path):
+        log_event('texture_missing', path=texture_path)
         return
 
-    # 7. Calculate and assign the correct UV coordinate for each vertex on the front face
-    print("Step 5: Calculating UV coordinates for each front-face vertex...")
-    for v_idx in vert_indices:
-        pt = card_mesh.vertices[v_idx]
-        # U coordinate is the horizontal position (based on X)
-        u = (pt[0] - min_x) / range_x
-        # V coordinate is the vertical position (based on Y)
-        v = (pt[1] - min_y) / range_y
-        uv[v_idx] = [u, v]
-        print(f"  - Vertex {v_idx}: pt=({pt[0]:.2f}, {pt[1]:.2f}, {pt[2]:.2f}) -> uv=({u:.2f}, {v:.2f})")
-
-    # 8. Apply the texture using the calculated UVs
-    card_mesh.visual = trimesh.visual.texture.TextureVisuals(uv=uv, image=texture_img)
-    print("Step 6: Applied texture visual to the mesh.")
-
-    # 9. Export the final model
-    scene = trimesh.Scene([card_mesh])
-    scene.export(output_glb_path)
-    print(f"✅ 3D card model saved to {output_glb_path}")
\ No newline at end of file
+    with open(texture_path, 'rb') as f:
+        glb_bytes = build_card_glb(f.read())
+    with open(output_glb_path, 'wb') as f:
+        f.write(glb_bytes)
+    log_event('card_saved', path=output_glb_path)
@@ -0,0 +1,369 @@
+import os
+import re
+import hashlib
+from bson.objectid import ObjectId
+from app.services.ai_summarizer import (summarize_texts_with_bart, summarize_long_texts,
+                                        clean_text, is_summary_error, DEFAULT_BATCH_SIZE,
+                                        MAX_INPUT_TOKENS, SUMMARY_ERROR_PREFIX)
+from app.services.text_extraction import extract_text
+from app.services.summary_cache import MongoChunkCache
+from app.services.model_generator import card_texture, build_card_glb
+from app.services.google_drive import DEFAULT_UPLOAD_WORKERS
+from app.services.storage import get_storage
+from app.services.job_queue import ALLOWED_EXTENSIONS
+from app.services.workspace import JobWorkspace
+from app.services.asset_queries import typed_fields
+from app.services.facets import invalidate_facets
+from app.services.manifest import reserve_versions
+from app.services.thumbnails import pdf_thumbnails, image_thumbnails, save_thumbnails
+from app.metrics import timed_stage, log_event
+
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.ppt': 'application/vnd.ms-powerpoint',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+
+def mime_type_for(filename):
+    return MIME_TYPES[os.path.splitext(filename)[1].lower()]
+
+
+class PipelineError(Exception):
+    """Raised when a single file cannot be turned into an asset."""
+
+
+def extract_upload_text(data, filename, token_budget=None, extract_workers=0):
+    """Validates the file type and returns the text extracted from the file's bytes."""
+    file_ext = os.path.splitext(filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise PipelineError(f"'{filename}' is not a supported format. Only PDF and PPT are allowed.")
+
+    with timed_stage('extraction'):
+        full_text = extract_text(data, file_ext, token_budget=token_budget, workers=extract_workers)
+    if not full_text.strip():
+        raise PipelineError(f"Could not extract text from {filename}.")
+    return full_text
+
+
+def read_upload_text(file_path, filename):
+    """Reads a file from disk and returns all of its text."""
+    with open(file_path, 'rb') as f:
+        return extract_upload_text(f.read(), filename)
+
+
+def token_budget_for(summary_mode):
+    """'truncate' mode only ever reads the first window, so extraction can stop there."""
+    return MAX_INPUT_TOKENS if summary_mode == 'truncate' else None
+
+
+def text_sha256(text, summary_mode='chunked'):
+    """
+    SHA-256 of the normalized extracted text, so re-exports of the same content
+    match. The mode is part of the hash: a 'truncate' text is only a prefix.
+    """
+    return hashlib.sha256(f"{summary_mode}\n{clean_text(text)}".encode('utf-8')).hexdigest()
+
+
+# Fields copied from an existing asset when an upload turns out to be a duplicate
+CARD_FIELDS = ('summary', 'text_hash', 'glb_key', 'glb_url', 'glb_id', 'texture_hash')
+FILE_FIELDS = ('content_hash', 'pdf_key', 'pdf_url', 'pdf_id', 'thumbnail_key')
+
+
+_FAILED_SUMMARY = re.compile('^' + re.escape(SUMMARY_ERROR_PREFIX))
+
+
+def find_reusable_asset(db, field, value):
+    """Finds a fully stored asset with the given content_hash/text_hash."""
+    # Assets saved before storage keys existed only have the Drive ids.
+    # Failed summaries are saved too, but never reused: those files get another try.
+    return db.assets.find_one(
+        {field: value, 'summary': {'$not': _FAILED_SUMMARY}, '$and': [
+            {'$or': [{'glb_key': {'$ne': None}}, {'glb_id': {'$ne': None}}]},
+            {'$or': [{'pdf_key': {'$ne': None}}, {'pdf_id': {'$ne': None}}]},
+        ]},
+        {name: 1 for name in CARD_FIELDS + FILE_FIELDS}
+    )
+
+
+def stored_fields(prefix, stored):
+    """Asset fields for a stored file: the storage key, plus the Drive id and link if it has them."""
+    return {f"{prefix}_key": stored['key'], f"{prefix}_url": stored['url'], f"{prefix}_id": stored['drive_id']}
+
+
+def _insert_asset(db, filename, coordinate, semester, branch, fields):
+    with reserve_versions(db) as version:
+        result = db.assets.insert_one({
+            "filename": filename,
+            "coordinate": coordinate,
+            "semester": semester,
+            "branch": branch,
+            **typed_fields(coordinate, semester),
+            **fields,
+            "version": version,
+        })
+    invalidate_facets(db)
+    return str(result.inserted_id)
+
+
+def reuse_asset(existing, filename, coordinate, semester, branch, db):
+    """Same bytes were uploaded before: only a new metadata row is written."""
+    asset_id = _insert_asset(db, filename, coordinate, semester, branch,
+                             {name: existing.get(name) for name in CARD_FIELDS + FILE_FIELDS})
+    log_event('duplicate_upload', filename=filename, asset_id=asset_id, duplicate_of=existing['_id'])
+    return {
+        'asset_id': asset_id,
+        'summary': existing.get('summary'),
+        'glb_key': existing.get('glb_key'),
+        'glb_id': existing.get('glb_id'),
+        'duplicate_of': str(existing['_id']),
+    }
+
+
+def reuse_card(card_source, filename, coordinate, semester, branch, db, stored_file, content_hash,
+               thumbnail_key=None):
+    """
+    Same text as an existing asset: its summary and GLB go with the newly uploaded file.
+    Without a first-page thumbnail of its own, the file shares the card's preview.
+    """
+    card_fields = {name: card_source.get(name) for name in CARD_FIELDS}
+    asset_id = _insert_asset(db, filename, coordinate, semester, branch, {
+        **card_fields,
+        **stored_fields('pdf', stored_file),
+        "content_hash": content_hash,
+        "thumbnail_key": thumbnail_key or card_source.get('thumbnail_key'),
+    })
+    log_event('card_reused', filename=filename, asset_id=asset_id, card_source=card_source['_id'])
+    return {
+        'asset_id': asset_id,
+        'summary': card_fields['summary'],
+        'glb_key': card_fields['glb_key'],
+        'glb_id': card_fields['glb_id'],
+        'duplicate_of': str(card_source['_id']),
+    }
+
+
+def render_card(workspace, key, filename, summary):
+    """
+    summary -> in-memory texture -> GLB card, stored in the job's workspace.
+    Returns (glb_filename, glb_source, texture_bytes); glb_source is what upload_many takes.
+    """
+    glb_filename = f"{os.path.splitext(filename)[0]}.glb"
+    with timed_stage('texture'):
+        texture_bytes, mime_type = card_texture(summary)
+    with timed_stage('glb_export'):
+        glb_bytes = build_card_glb(texture_bytes, mime_type)
+    # The key keeps two files with the same name apart inside one job
+    glb_source = workspace.put(f"{key}_{glb_filename}", glb_bytes)
+    return glb_filename, glb_source, texture_bytes
+
+
+def store_preview(db, key, render):
+    """
+    Renders and saves a thumbnail set under key (a content hash). A preview
+    is nice to have, so failures are only logged. Returns the key or None.
+    """
+    try:
+        if not db.thumbnails.find_one({'_id': key}, {'_id': 1}):
+            with timed_stage('thumbnails'):
+                sizes = render()
+            save_thumbnails(db, key, sizes)
+        return key
+    except Exception as e:
+        log_event('preview_failed', key=key, error=str(e))
+        return None
+
+
+def _require_upload(stored, what, filename):
+    """Storage reports a failed put as None; never save half an asset."""
+    if not stored:
+        raise PipelineError(f"Storing the {what} for '{filename}' failed.")
+    return stored
+
+
+def summarize_texts(texts, db, batch_size=DEFAULT_BATCH_SIZE, summary_mode='chunked'):
+    """
+    Summarizes extracted texts in one batched pass. 'chunked' mode covers the
+    whole document via map-reduce; 'truncate' only reads the first 1024 tokens.
+    """
+    with timed_stage('summarization'):
+        if summary_mode == 'truncate':
+            return summarize_texts_with_bart(texts, max_batch_size=batch_size)
+        return summarize_long_texts(texts, chunk_cache=MongoChunkCache(db), max_batch_size=batch_size)
+
+
+def process_files(files, coordinate, semester, branch, db, batch_size=DEFAULT_BATCH_SIZE,
+                  summary_mode='chunked', upload_workers=DEFAULT_UPLOAD_WORKERS, extract_workers=0,
+                  workspace=None, storage=None):
+    """
+    Runs the full asset pipeline for a batch of uploaded files.
+
+    files is a list of (key, file_path, filename). Every file is hashed first:
+    bytes already seen (in Mongo or earlier in this batch) only get a new
+    metadata row, and text already seen reuses the existing summary and card.
+    The remaining texts are summarized in a single batched call, the cards
+    are rendered, and then every file of the batch is stored in one go.
+    Yields (key, result, error) per file, with exactly one of result/error set.
+
+    Generated cards go to workspace (a JobWorkspace); without one, a private
+    workspace is created for this call and removed afterwards. Files are
+    stored with storage, the configured backend by default.
+    """
+    if workspace is None:
+        with JobWorkspace(ObjectId()) as workspace:
+            yield from process_files(files, coordinate, semester, branch, db, batch_size,
+                                     summary_mode, upload_workers, extract_workers, workspace, storage)
+        return
+    if storage is None:
+        storage = get_storage()
+
+    texts, hashes = {}, {}
+    # key -> thumbnail key; PDFs get their first page, slides the card texture later
+    previews = {}
+    # Files that must wait for an earlier file of this batch with the same bytes/text
+    byte_dups, text_dups = {}, {}
+    first_by_content, first_by_text = {}, {}
+    # Files whose text matches an existing asset: only the original needs uploading
+    card_reuse = []
+
+    def finish(key, result, error):
+        """Yields a file's outcome, then settles the byte-identical copies waiting on it."""
+        yield key, result, error
+        for dup_key, _, dup_name in byte_dups.pop(key, []):
+            if error is not None:
+                yield dup_key, None, PipelineError(f"'{dup_name}' duplicates a file that failed: {error}")
+                continue
+            try:
+                source = db.assets.find_one({'_id': ObjectId(result['asset_id'])})
+                yield dup_key, reuse_asset(source, dup_name, coordinate, semester, branch, db), None
+            except Exception as e:
+                yield dup_key, None, e
+
+    def fail_with_text_dups(key, error):
+        yield from finish(key, None, error)
+        for dup_key, _, dup_name in text_dups.pop(key, []):
+            yield from finish(dup_key, None,
+                              PipelineError(f"'{dup_name}' duplicates a file that failed: {error}"))
+
+    for key, file_path, filename in files:
+        try:
+            # The spooled upload is read once; hashing and extraction share the bytes
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+            if content_hash in first_by_content:
+                byte_dups.setdefault(first_by_content[content_hash], []).append((key, file_path, filename))
+                continue
+            existing = find_reusable_asset(db, 'content_hash', content_hash)
+            if existing:
+                yield key, reuse_asset(existing, filename, coordinate, semester, branch, db), None
+                continue
+            first_by_content[content_hash] = key
+            if filename.lower().endswith('.pdf'):
+                previews[key] = store_preview(db, content_hash, lambda: pdf_thumbnails(data))
+
+            text = extract_upload_text(data, filename, token_budget_for(summary_mode), extract_workers)
+            text_hash = text_sha256(text, summary_mode)
+            hashes[key] = (content_hash, text_hash)
+            if text_hash in first_by_text:
+                text_dups.setdefault(first_by_text[text_hash], []).append((key, file_path, filename))
+                continue
+            existing = find_reusable_asset(db, 'text_hash', text_hash)
+            if existing:
+                card_reuse.append((key, file_path, filename, existing))
+                continue
+            first_by_text[text_hash] = key
+            texts[key] = text
+        except Exception as e:
+            yield from finish(key, None, e)
+
+    # 1. One batched summarization call for every new text
+    summarizable = [(key, file_path, filename) for key, file_path, filename in files if key in texts]
+    summaries = {}
+    if summarizable:
+        summarized = summarize_texts([texts[key] for key, _, _ in summarizable], db,
+                                     batch_size=batch_size, summary_mode=summary_mode)
+        summaries = {key: summary for (key, _, _), summary in zip(summarizable, summarized)}
+
+    # 2. Render the cards (CPU bound, local)
+    cards, texture_hashes = {}, {}
+    for key, file_path, filename in summarizable:
+        # A failed summary is never rendered, stored or saved as an asset
+        if is_summary_error(summaries[key]):
+            yield from fail_with_text_dups(key, PipelineError(f"Summarizing '{filename}' failed: {summaries[key]}"))
+            continue
+        try:
+            cards[key] = glb_filename, glb_source, texture_bytes = render_card(
+                workspace, key, filename, summaries[key])
+            texture_hashes[key] = hashlib.sha256(texture_bytes).hexdigest()
+            if previews.get(key) is None:
+                previews[key] = store_preview(db, texture_hashes[key], lambda: image_thumbnails(texture_bytes))
+        except Exception as e:
+            yield from fail_with_text_dups(key, e)
+
+    # 3. Store every file of the batch at once (concurrent uploads on Drive)
+    uploads = []
+    for key, file_path, filename in summarizable:
+        if key in cards:
+            glb_filename, glb_source, _ = cards[key]
+            uploads.append(((key, 'file'), (file_path, filename, mime_type_for(filename))))
+            uploads.append(((key, 'card'), (glb_source, glb_filename, "model/gltf-binary")))
+            for dup_key, dup_path, dup_name in text_dups.get(key, []):
+                uploads.append(((dup_key, 'file'), (dup_path, dup_name, mime_type_for(dup_name))))
+    for key, file_path, filename, _ in card_reuse:
+        uploads.append(((key, 'file'), (file_path, filename, mime_type_for(filename))))
+
+    with timed_stage('upload'):
+        uploaded = dict(zip([slot for slot, _ in uploads],
+                            storage.put_many(db, [item for _, item in uploads], max_workers=upload_workers)))
+
+    # 4. Save the assets, then the duplicates that point at them
+    for key, file_path, filename in summarizable:
+        if key not in cards:
+            continue
+        try:
+            stored_file = _require_upload(uploaded[(key, 'file')], 'file', filename)
+            stored_card = _require_upload(uploaded[(key, 'card')], '3D card', filename)
+            content_hash, text_hash = hashes[key]
+            asset_id = _insert_asset(db, filename, coordinate, semester, branch, {
+                **stored_fields('pdf', stored_file),
+                **stored_fields('glb', stored_card),
+                "summary": summaries[key],
+                "content_hash": content_hash,
+                "text_hash": text_hash,
+                "texture_hash": texture_hashes[key],
+                "thumbnail_key": previews.get(key),
+            })
+        except Exception as e:
+            yield from fail_with_text_dups(key, e)
+            continue
+
+        yield from finish(key, {
+            'asset_id': asset_id,
+            'summary': summaries[key],
+            'glb_key': stored_card['key'],
+            'glb_id': stored_card['drive_id'],
+            'duplicate_of': None,
+        }, None)
+
+        source = db.assets.find_one({'_id': ObjectId(asset_id)})
+        for dup_key, dup_path, dup_name in text_dups.pop(key, []):
+            card_reuse.append((dup_key, dup_path, dup_name, source))
+
+    for key, file_path, filename, source in card_reuse:
+        try:
+            stored_file = _require_upload(uploaded[(key, 'file')], 'file', filename)
+            result = reuse_card(source, filename, coordinate, semester, branch, db,
+                                stored_file, hashes[key][0], previews.get(key))
+        except Exception as e:
+            yield from finish(key, None, e)
+            continue
+        yield from finish(key, result, None)
+
+
+def process_file(file_path, filename, coordinate, semester, branch, db):
+    """Single-file convenience wrapper around process_files."""
+    for _, result, error in process_files([(0, file_path, filename)], coordinate, semester, branch, db):
+        if error:
+            raise error
+        return result
@@ -0,0 +1,276 @@
+import os
+import re
+import hashlib
+import tempfile
+import threading
+from io import BytesIO
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, send_file
+from pymongo.errors import PyMongoError
+from app.services.google_drive import upload_many, get_files_metadata, DEFAULT_UPLOAD_WORKERS
+from app.services.model_cache import range_not_satisfiable
+from app.metrics import log_event
+
+# Stored files (uploaded documents, GLB cards) are addressed by the sha256 of
+# their bytes. That key is what assets record (pdf_key, glb_key), whichever
+# backend holds the bytes:
+#   drive:  Google Drive only, as before
+#   local:  content-addressed files on this machine, no Google account needed
+#   tiered: written locally first, copied to Drive in the background
+#
+# storage_objects has one document per key:
+#   {_id: key, filename, mime_type, size, created_at,
+#    drive_id, drive_url (once on Drive), replicated (tiered only)}
+# Objects written before a store became tiered have no 'replicated' field;
+# anything not replicated: True still needs copying to Drive.
+
+STORAGE_BACKENDS = ('drive', 'local', 'tiered')
+_KEY = re.compile(r'^[0-9a-f]{64}$')
+_BLOCK = 1024 * 1024
+
+
+def is_storage_key(value):
+    """Storage keys are 64 hex chars; Drive file ids never are."""
+    return bool(value and _KEY.match(value))
+
+
+def _open(source):
+    # Upload items carry a path, or the bytes themselves (in-memory workspaces)
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    return open(source, 'rb')
+
+
+def _copy_hashing(src, dst=None):
+    """Reads src block by block (copying it to dst if given). Returns its (key, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: src.read(_BLOCK), b''):
+        digest.update(block)
+        if dst is not None:
+            dst.write(block)
+        size += len(block)
+    return digest.hexdigest(), size
+
+
+def _key_and_size(source):
+    with _open(source) as src:
+        return _copy_hashing(src)
+
+
+def _record(db, key, filename, mime_type, size, on_insert=None, **fields):
+    update = {'$setOnInsert': {'filename': filename, 'mime_type': mime_type, 'size': size,
+                               'created_at': datetime.now(timezone.utc), **(on_insert or {})}}
+    if fields:
+        update['$set'] = fields
+    db.storage_objects.update_one({'_id': key}, update, upsert=True)
+
+
+def drive_location(db, key):
+    """(drive_id, drive_url) of a stored object, or None if it isn't on Drive (yet)."""
+    doc = db.storage_objects.find_one({'_id': key}, {'drive_id': 1, 'drive_url': 1})
+    if not doc or not doc.get('drive_id'):
+        return None
+    return doc['drive_id'], doc.get('drive_url')
+
+
+def _stored(key, drive_id=None, url=None):
+    return {'key': key, 'drive_id': drive_id, 'url': url}
+
+
+class DriveStorage:
+    """Google Drive. Each key is uploaded once; later puts of the same bytes reuse it."""
+
+    def put_many(self, db, items, max_workers=DEFAULT_UPLOAD_WORKERS):
+        """
+        Stores (source, filename, mime_type) items concurrently. Returns one
+        {'key', 'drive_id', 'url'} per item, or None where the upload failed.
+        """
+        # Hashed in blocks; the upload itself streams from the path (MediaFileUpload)
+        sized = [_key_and_size(source) for source, _, _ in items]
+        keys = [key for key, _ in sized]
+        known = {doc['_id']: doc for doc in db.storage_objects.find(
+            {'_id': {'$in': keys}, 'drive_id': {'$ne': None}}, {'drive_id': 1, 'drive_url': 1})}
+
+        todo = [i for i, key in enumerate(keys) if key not in known]
+        uploaded = dict(zip(todo, upload_many([items[i] for i in todo], max_workers=max_workers)))
+
+        results = []
+        for i, ((key, size), (_, filename, mime_type)) in enumerate(zip(sized, items)):
+            if key in known:
+                results.append(_stored(key, known[key]['drive_id'], known[key].get('drive_url')))
+                continue
+            url, drive_id = uploaded[i]
+            if not drive_id:
+                results.append(None)
+                continue
+            _record(db, key, filename, mime_type, size, drive_id=drive_id, drive_url=url)
+            results.append(_stored(key, drive_id, url))
+        return results
+
+    def send(self, db, key, max_age):
+        # Drive reads go through the streaming proxy (admin.serve_model)
+        return None
+
+
+class LocalStorage:
+    """
+    Content-addressed files under root, sharded two levels deep
+    (ab/cd/abcd...) so no directory grows too large.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def _write(self, source):
+        """Streams source into the store, hashing as it goes. Returns (key, size)."""
+        os.makedirs(self.root, exist_ok=True)
+        # The key is only known once every byte is read, so the copy lands in a
+        # temp file and is renamed into place: a reader sees all of it or nothing
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f, _open(source) as src:
+                key, size = _copy_hashing(src, f)
+                f.flush()
+                os.fsync(f.fileno())
+            path = self.path_for(key)
+            if os.path.exists(path):
+                os.remove(tmp_path)  # Same key, same bytes
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return key, size
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put(self, db, source, filename, mime_type, on_insert=None):
+        key, size = self._write(source)
+        _record(db, key, filename, mime_type, size, on_insert=on_insert)
+        return _stored(key)
+
+    def put_many(self, db, items, max_workers=DEFAULT_UPLOAD_WORKERS, on_insert=None):
+        results = []
+        for source, filename, mime_type in items:
+            try:
+                results.append(self.put(db, source, filename, mime_type, on_insert))
+            except (OSError, PyMongoError) as e:
+                # The file (or its storage_objects record) failed; the rest of the batch goes on
+                log_event('storage_error', backend='local', filename=filename, error=str(e))
+                results.append(None)
+        return results
+
+    def send(self, db, key, max_age):
+        """Response for a stored file (sendfile, Range and ETag support), or None if it isn't here."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        unsatisfiable = range_not_satisfiable(os.path.getsize(path), key)
+        if unsatisfiable is not None:
+            return unsatisfiable
+        doc = db.storage_objects.find_one({'_id': key}, {'mime_type': 1})
+        response = send_file(path, mimetype=(doc or {}).get('mime_type') or 'application/octet-stream',
+                             conditional=True, etag=key, max_age=max_age)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+class TieredStorage:
+    """
+    Local disk first, Drive as the durable copy. Puts return once the local
+    write is done; a background thread pool uploads to Drive. Anything still
+    unreplicated when the process exits is picked up by `flask replicate-storage`.
+    """
+
+    def __init__(self, local, drive, replication_workers=2):
+        self.local = local
+        self.drive = drive
+        self._replicator = ThreadPoolExecutor(max_workers=replication_workers,
+                                              thread_name_prefix='replicate')
+
+    def put_many(self, db, items, max_workers=DEFAULT_UPLOAD_WORKERS):
+        results = self.local.put_many(db, items, max_workers, on_insert={'replicated': False})
+        for stored in results:
+            if stored:
+                self._replicator.submit(self.replicate, db, stored['key'])
+        return results
+
+    def replicate(self, db, key):
+        """Copies one object to Drive. Returns True once it is there."""
+        doc = db.storage_objects.find_one({'_id': key})
+        if doc is None or doc.get('replicated'):
+            return True
+        if doc.get('drive_id'):
+            # Put on Drive by a 'drive' store before this one became tiered
+            db.storage_objects.update_one({'_id': key}, {'$set': {'replicated': True}})
+            return True
+        try:
+            stored = self.drive.put_many(db, [(self.local.path_for(key), doc['filename'], doc['mime_type'])],
+                                         max_workers=1)[0]
+        except Exception as e:
+            stored = None
+            log_event('storage_error', backend='tiered', key=key, error=str(e))
+        if not stored:
+            return False
+        db.storage_objects.update_one({'_id': key}, {'$set': {'replicated': True}})
+        return True
+
+    def send(self, db, key, max_age):
+        return self.local.send(db, key, max_age)
+
+
+def replicate_pending(db, storage):
+    """Uploads every object a tiered store hasn't copied to Drive yet. Returns (copied, failed)."""
+    pending = list(db.storage_objects.find({'replicated': {'$ne': True}}, {'drive_id': 1}))
+    # Objects a 'drive' store already put on Drive are checked in batched
+    # metadata calls instead of being trusted blindly
+    drive_ids = [doc['drive_id'] for doc in pending if doc.get('drive_id')]
+    on_drive = get_files_metadata(drive_ids, fields='id') if drive_ids else {}
+    copied = failed = 0
+    for doc in pending:
+        drive_id = doc.get('drive_id')
+        if drive_id and drive_id not in on_drive:
+            # Drive couldn't say; the next run tries again
+            failed += 1
+            continue
+        if drive_id and on_drive[drive_id] is None:
+            # Deleted on Drive: the local copy goes up again
+            db.storage_objects.update_one({'_id': doc['_id']}, {'$set': {'drive_id': None, 'drive_url': None}})
+        if storage.replicate(db, doc['_id']):
+            copied += 1
+        else:
+            failed += 1
+    return copied, failed
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide storage backend configured from the app config."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                config = current_app.config
+                backend = config['STORAGE_BACKEND']
+                if backend == 'drive':
+                    _storage = DriveStorage()
+                elif backend == 'local':
+                    _storage = LocalStorage(config['STORAGE_ROOT'])
+                elif backend == 'tiered':
+                    _storage = TieredStorage(LocalStorage(config['STORAGE_ROOT']), DriveStorage(),
+                                             config['STORAGE_REPLICATION_WORKERS'])
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', "
+                                     f"expected one of {', '.join(STORAGE_BACKENDS)}.")
+    return _storage
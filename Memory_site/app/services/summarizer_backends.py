@@ -0,0 +1,184 @@
+import os
+import re
+import time
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from app.metrics import log_event
+
+# Exported ONNX graphs are cached here so the (slow) export only happens once.
+# init_app replaces the default with ONNX_CACHE_DIR from the app config.
+ONNX_CACHE_DIR = os.path.join('temp', 'onnx')
+
+
+def init_app(app):
+    global ONNX_CACHE_DIR
+    ONNX_CACHE_DIR = app.config['ONNX_CACHE_DIR']
+
+
+def load_torch(model_name):
+    """Plain fp32 PyTorch, the original behaviour."""
+    from transformers import AutoModelForSeq2SeqLM
+    return AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+
+
+def load_torch_int8(model_name):
+    """fp32 weights with every nn.Linear dynamically quantized to int8 (CPU only)."""
+    import torch
+    model = load_torch(model_name)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_onnx(model_name):
+    """
+    ONNX Runtime encoder/decoder sessions (with past key values) via optimum.
+    Requires `pip install optimum[onnxruntime]`.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise RuntimeError("The 'onnx' backend needs optimum[onnxruntime] installed.")
+
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '__'))
+    if os.path.isdir(export_dir):
+        return ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+
+    log_event('onnx_export', model=model_name, path=export_dir)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+BACKENDS = {
+    'torch': load_torch,
+    'torch-int8': load_torch_int8,
+    'onnx': load_onnx,
+}
+
+
+def load_backend(backend_name, model_name):
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown summarization backend '{backend_name}'. "
+                         f"Choose one of: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[backend_name](model_name)
+
+
+# --- Backend comparison ---
+
+def _rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    """Highest resident set size this process has reached, in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _tokens(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def _ngrams(tokens, n):
+    return [tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap or not candidate_total or not reference_total:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n):
+    cand, ref = _ngrams(_tokens(candidate), n), _ngrams(_tokens(reference), n)
+    ref_counts = {}
+    for gram in ref:
+        ref_counts[gram] = ref_counts.get(gram, 0) + 1
+    overlap = 0
+    for gram in cand:
+        if ref_counts.get(gram):
+            ref_counts[gram] -= 1
+            overlap += 1
+    return _f1(overlap, len(cand), len(ref))
+
+
+def rouge_l(candidate, reference):
+    cand, ref = _tokens(candidate), _tokens(reference)
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(ref) + 1)
+    for c in cand:
+        current = [0]
+        for j, r in enumerate(ref):
+            current.append(previous[j] + 1 if c == r else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
+
+
+def _run_candidate(backend_name, model_name, texts, max_batch_size, onnx_cache_dir):
+    """Loads one (backend, model) pair and summarizes texts. Runs in its own process."""
+    global ONNX_CACHE_DIR
+    from app.services.ai_summarizer import generate_summaries
+    from transformers import AutoTokenizer
+
+    # A spawned process starts from the module defaults, not the app config
+    ONNX_CACHE_DIR = onnx_cache_dir
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    tok = AutoTokenizer.from_pretrained(model_name)
+    mdl = load_backend(backend_name, model_name)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    started = time.perf_counter()
+    summaries = generate_summaries(tok, mdl, texts, max_batch_size)
+    elapsed = time.perf_counter() - started
+
+    row = {
+        'backend': backend_name,
+        'model': model_name,
+        'load_seconds': round(load_seconds, 2),
+        'seconds_per_doc': round(elapsed / max(1, len(texts)), 3),
+        'rss_model_mb': round(rss_loaded - rss_before, 1),
+        'rss_peak_mb': round(_peak_rss_mb(), 1),
+    }
+    return row, summaries
+
+
+def compare_backends(texts, candidates, reference=('torch', 'facebook/bart-large-cnn'), max_batch_size=4):
+    """
+    Summarizes texts with the reference (backend, model) pair and every
+    candidate pair, one at a time so memory numbers don't overlap.
+
+    Reports load time, latency per document, RSS growth and the ROUGE
+    F1 of each candidate's summaries against the reference summaries.
+    Every pair runs in a fresh process, so its peak RSS is its own and not
+    left over from a model loaded before it.
+    """
+    results = []
+    reference_summaries = None
+    for backend_name, model_name in [reference] + [c for c in candidates if c != reference]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            row, summaries = pool.submit(_run_candidate, backend_name, model_name,
+                                         texts, max_batch_size, ONNX_CACHE_DIR).result()
+
+        if reference_summaries is None:
+            reference_summaries = summaries
+        else:
+            pairs = list(zip(summaries, reference_summaries))
+            for name, score in (('rouge1', lambda c, r: rouge_n(c, r, 1)),
+                                ('rouge2', lambda c, r: rouge_n(c, r, 2)),
+                                ('rougeL', rouge_l)):
+                row[name] = round(sum(score(c, r) for c, r in pairs) / max(1, len(pairs)), 4)
+        results.append(row)
+
+    return results
@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+from app.metrics import log_event
+
+
+class MongoChunkCache:
+    """
+    Chunk summaries persisted in the 'summary_chunks' collection, so every
+    worker process shares them and they survive restarts.
+    """
+
+    def __init__(self, db):
+        self.collection = db.summary_chunks
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        try:
+            cursor = self.collection.find({'_id': {'$in': list(keys)}}, {'summary': 1})
+            return {doc['_id']: doc['summary'] for doc in cursor}
+        except Exception as e:
+            # A cache outage only costs recomputation
+            log_event('chunk_cache_error', operation='get', error=str(e))
+            return {}
+
+    def put_many(self, items):
+        now = datetime.now(timezone.utc)
+        for key, summary in items.items():
+            try:
+                self.collection.update_one(
+                    {'_id': key},
+                    {'$set': {'summary': summary, 'updated_at': now}},
+                    upsert=True
+                )
+            except Exception as e:
+                log_event('chunk_cache_error', operation='put', key=key, error=str(e))
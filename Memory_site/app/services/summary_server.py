@@ -0,0 +1,93 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services import ai_summarizer
+from app.metrics import log_event
+
+# One model instance per server; generate() calls are serialized on it so
+# concurrent clients queue up instead of oversubscribing the CPU.
+_inference_lock = threading.Lock()
+_stats = {'started_at': time.time(), 'requests': 0, 'documents': 0, 'busy': False}
+
+
+class SummaryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health    -> model load state and request counters
+    POST /summarize -> {"texts": [...], "max_batch_size": n} => {"summaries": [...]}
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send_json(404, {'error': 'Not found'})
+
+        status = ai_summarizer.model_status()
+        if status['error']:
+            state, code = 'error', 503
+        elif status['loaded']:
+            state, code = 'ok', 200
+        else:
+            # Lazy mode: the model loads on the first /summarize call
+            state, code = 'idle', 200
+        self._send_json(code, {
+            'status': state,
+            **status,
+            'busy': _stats['busy'],
+            'uptime_seconds': round(time.time() - _stats['started_at'], 1),
+            'requests_served': _stats['requests'],
+            'documents_summarized': _stats['documents'],
+        })
+
+    def do_POST(self):
+        if self.path != '/summarize':
+            return self._send_json(404, {'error': 'Not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            texts = payload['texts']
+            max_batch_size = int(payload.get('max_batch_size') or ai_summarizer.DEFAULT_BATCH_SIZE)
+        except Exception as e:
+            return self._send_json(400, {'error': f'Invalid request: {e}'})
+
+        with _inference_lock:
+            _stats['busy'] = True
+            try:
+                summaries = ai_summarizer.local_summarize(texts, max_batch_size)
+            finally:
+                _stats['busy'] = False
+                _stats['requests'] += 1
+                _stats['documents'] += len(texts)
+        self._send_json(200, {'summaries': summaries})
+
+    def log_message(self, format, *args):
+        log_event('summary_server_request', client=self.address_string(), message=format % args)
+
+
+def warm_up():
+    """Loads the model and runs one tiny generate so the first real call is fast."""
+    if ai_summarizer.load_model():
+        ai_summarizer.local_summarize(["Warm-up run. " * 20], max_batch_size=1)
+        log_event('model_warmed_up', model=ai_summarizer.model_name)
+
+
+def serve(host='127.0.0.1', port=8765, warm=False):
+    """Runs the summarization server until interrupted."""
+    if warm:
+        warm_up()
+    server = ThreadingHTTPServer((host, port), SummaryRequestHandler)
+    log_event('summary_server_started', url=f"http://{host}:{port}", model_load='warm' if warm else 'lazy')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
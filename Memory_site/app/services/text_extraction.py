@@ -0,0 +1,109 @@
+import threading
+import multiprocessing
+import multiprocessing.util
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from pptx import Presentation
+
+# Rough characters-per-token for BART's BPE on English text. Kept low on
+# purpose so an early stop always collects a little more than the budget.
+CHARS_PER_TOKEN = 3
+
+# PDFs with fewer pages than this are not worth shipping to other processes
+PARALLEL_MIN_PAGES = 40
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _as_bytes(source):
+    """Accepts raw bytes or any binary stream (e.g. a werkzeug FileStorage.stream)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    return source.read()
+
+
+def iter_pdf_pages(source, start=0, stop=None):
+    """Yields the text of each PDF page, opening the document from memory."""
+    doc = fitz.open(stream=_as_bytes(source), filetype='pdf')
+    try:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for number in range(start, stop):
+            yield doc.load_page(number).get_text()
+    finally:
+        doc.close()
+
+
+def iter_pptx_slides(source):
+    """Yields the text of each slide, one slide at a time."""
+    prs = Presentation(BytesIO(_as_bytes(source)))
+    for slide in prs.slides:
+        yield "\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text"))
+
+
+def take_until_budget(pieces, token_budget=None, separator=""):
+    """Joins pieces, stopping as soon as the estimated token budget is covered."""
+    collected = []
+    chars = 0
+    char_budget = token_budget * CHARS_PER_TOKEN if token_budget else None
+    for piece in pieces:
+        collected.append(piece)
+        chars += len(piece)
+        if char_budget is not None and chars >= char_budget:
+            break
+    return separator.join(collected)
+
+
+def _pdf_page_range(data, start, stop):
+    # Runs in a pool process; only the page range's text travels back
+    return "".join(iter_pdf_pages(data, start, stop))
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Callers run threads (uploads, heartbeats), which fork doesn't copy safely
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            # Inside a worker process (job queue, bulk import) nothing else stops
+            # this pool, and the worker would wait on its children forever at exit.
+            # The high priority runs it before multiprocessing closes the pool's queues.
+            multiprocessing.util.Finalize(None, _pool.shutdown, exitpriority=100)
+            _pool_workers = workers
+        return _pool
+
+
+def extract_pdf_parallel(data, workers):
+    """Extracts all pages of a large PDF, one contiguous page range per process."""
+    doc = fitz.open(stream=data, filetype='pdf')
+    page_count = doc.page_count
+    doc.close()
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return "".join(iter_pdf_pages(data))
+
+    step = -(-page_count // workers)  # ceil division
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    pool = _get_pool(workers)
+    futures = [pool.submit(_pdf_page_range, data, start, stop) for start, stop in ranges]
+    return "".join(future.result() for future in futures)
+
+
+def extract_text(source, file_ext, token_budget=None, workers=0):
+    """
+    Extracts text from an in-memory PDF/PPTX (bytes or binary stream).
+
+    With a token_budget, pages are read one at a time and extraction stops
+    once enough text has been collected. Without one, the whole document is
+    read, using a process pool for large PDFs when workers > 1.
+    """
+    data = _as_bytes(source)
+    if file_ext == '.pdf':
+        if token_budget is None and workers > 1:
+            return extract_pdf_parallel(data, workers)
+        return take_until_budget(iter_pdf_pages(data), token_budget)
+    return take_until_budget(iter_pptx_slides(data), token_budget, separator="\n")
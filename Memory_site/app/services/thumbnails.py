@@ -0,0 +1,82 @@
+from io import BytesIO
+from bson.binary import Binary
+from PIL import Image
+
+# Widths rendered at upload time; the endpoint serves the closest one.
+# init_app replaces the default with THUMBNAIL_WIDTHS from the app config.
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_MIME_TYPE = 'image/webp'
+
+
+def init_app(app):
+    global THUMBNAIL_WIDTHS
+    THUMBNAIL_WIDTHS = tuple(app.config['THUMBNAIL_WIDTHS'])
+
+
+def _encode(img):
+    buffer = BytesIO()
+    img.save(buffer, format='WEBP', quality=80, method=4)
+    return buffer.getvalue()
+
+
+def thumbnail_set(img, widths=None):
+    """{width: webp bytes} for each width, downscaled from one source image."""
+    widths = widths or THUMBNAIL_WIDTHS
+    img = img.convert('RGB')
+    sizes = {}
+    for width in sorted(widths, reverse=True):
+        width = min(width, img.width)
+        height = max(1, round(img.height * width / img.width))
+        sizes[str(width)] = _encode(img.resize((width, height), Image.LANCZOS))
+    return sizes
+
+
+def pdf_thumbnails(data, widths=None):
+    """Renders the first PDF page once, at the largest width, and scales it down."""
+    widths = widths or THUMBNAIL_WIDTHS
+    import fitz  # PyMuPDF; only the pipeline side renders
+
+    doc = fitz.open(stream=data, filetype='pdf')
+    try:
+        if not doc.page_count:
+            return {}
+        page = doc.load_page(0)
+        zoom = max(widths) / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        img = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    finally:
+        doc.close()
+    return thumbnail_set(img, widths)
+
+
+def image_thumbnails(image_bytes, widths=None):
+    """Thumbnails of an encoded image, e.g. the card texture for slides."""
+    return thumbnail_set(Image.open(BytesIO(image_bytes)), widths)
+
+
+def save_thumbnails(db, key, sizes):
+    """
+    Stores a thumbnail set under a content hash. The key identifies the
+    content, so a set that already exists is never rewritten.
+    """
+    db.thumbnails.update_one(
+        {'_id': key},
+        {'$setOnInsert': {
+            'mime_type': THUMBNAIL_MIME_TYPE,
+            'sizes': {width: Binary(data) for width, data in sizes.items()},
+        }},
+        upsert=True,
+    )
+
+
+def get_thumbnail(db, key, width):
+    """
+    (bytes, mime_type, served_width) for the smallest stored width that
+    is at least `width` (the largest one otherwise), or None.
+    """
+    doc = db.thumbnails.find_one({'_id': key})
+    if not doc or not doc.get('sizes'):
+        return None
+    available = sorted(int(w) for w in doc['sizes'])
+    chosen = next((w for w in available if w >= width), available[-1])
+    return bytes(doc['sizes'][str(chosen)]), doc['mime_type'], chosen
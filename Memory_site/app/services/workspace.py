@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+from werkzeug.utils import secure_filename
+
+# RAM-backed on Linux, so intermediate cards never hit the disk
+SHM_DIR = '/dev/shm'
+
+
+def default_root():
+    """tmpfs when available, the system temp dir otherwise."""
+    if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK):
+        return os.path.join(SHM_DIR, 'memory_site')
+    return os.path.join(tempfile.gettempdir(), 'memory_site')
+
+
+class JobWorkspace:
+    """
+    Scratch space private to one job: a unique directory (or a plain dict
+    when in_memory is set) that is removed when the job finishes.
+
+    Files are addressed by name; put() returns what the Drive upload
+    accepts for that file, a path on disk or the bytes themselves.
+    Use it as a context manager so cleanup also happens on errors.
+    """
+
+    def __init__(self, job_id, root=None, in_memory=False):
+        self.job_id = str(job_id)
+        self.in_memory = in_memory
+        self.dir = None
+        self._files = {}
+        if not in_memory:
+            root = root or default_root()
+            os.makedirs(root, exist_ok=True)
+            # mkdtemp adds a random suffix, so a reclaimed job never shares a retry's files
+            self.dir = tempfile.mkdtemp(prefix=f"job-{self.job_id}-", dir=root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+    def path(self, name):
+        if self.in_memory:
+            raise RuntimeError("An in-memory workspace has no paths.")
+        return os.path.join(self.dir, secure_filename(name) or 'file')
+
+    def put(self, name, data):
+        if self.in_memory:
+            self._files[name] = bytes(data)
+            return self._files[name]
+        path = self.path(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def get(self, name):
+        if self.in_memory:
+            return self._files[name]
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def cleanup(self):
+        self._files.clear()
+        if self.dir:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
@@ -0,0 +1,71 @@
+"""
+Deterministic synthetic corpus: PDFs and PPTXs in a few sizes, built from a
+seeded word list so every run (and every machine) benchmarks the same bytes.
+"""
+import os
+import random
+import fitz  # PyMuPDF
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+# Pages (PDF) or slides (PPTX) per document
+SIZES = {'small': 2, 'medium': 15, 'large': 60}
+
+VOCABULARY = (
+    "memory cell neuron signal protein energy system network circuit voltage current "
+    "algorithm structure process theory model data analysis function equation matrix "
+    "vector gradient learning cortex synapse receptor membrane enzyme reaction balance "
+    "semester lecture module chapter example definition theorem proof result method"
+).split()
+
+
+def paragraph(rng, sentences=6):
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 18))]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def write_pdf(path, pages, seed):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(56, 56, 540, 90), f"Chapter {number + 1}", fontsize=18)
+        page.insert_textbox(fitz.Rect(56, 100, 540, 780),
+                            "\n\n".join(paragraph(rng) for _ in range(4)), fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def write_pptx(path, slides, seed):
+    rng = random.Random(seed)
+    prs = Presentation()
+    for number in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {number + 1}"
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5))
+        box.text_frame.word_wrap = True
+        box.text_frame.text = paragraph(rng, sentences=4)
+        box.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
+    prs.save(path)
+
+
+def build_corpus(directory, docs_per_size=3, kinds=('pdf', 'pptx'), sizes=tuple(SIZES)):
+    """
+    Creates (or reuses) the corpus under directory.
+    Returns [(path, kind, size_name)] in a stable order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for size_name in sizes:
+        for kind in kinds:
+            for index in range(docs_per_size):
+                path = os.path.join(directory, f"{size_name}_{index}.{kind}")
+                if not os.path.exists(path):
+                    seed = f"{size_name}-{kind}-{index}"
+                    writer = write_pdf if kind == 'pdf' else write_pptx
+                    writer(path, SIZES[size_name], seed)
+                corpus.append((path, kind, size_name))
+    return corpus
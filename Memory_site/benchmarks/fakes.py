@@ -0,0 +1,96 @@
+"""
+Offline stand-ins for the pipeline's external services, so a benchmark run
+never touches Google Drive or a real Mongo server.
+"""
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FakeDrive:
+    """
+    Stands in for the Drive storage backend (storage.DriveStorage): files
+    are copied into a local directory, with an optional simulated
+    per-upload latency.
+    """
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.uploads = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _upload(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            data = bytes(source)
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+        if self.latency:
+            time.sleep(self.latency)
+        key = hashlib.sha256(data).hexdigest()
+        file_id = key[:32]
+        with open(os.path.join(self.directory, file_id), 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self.uploads += 1
+            self.bytes += len(data)
+        return {'key': key, 'drive_id': file_id, 'url': f"https://drive.invalid/{file_id}"}
+
+    def put_many(self, db, items, max_workers=4):
+        """Same contract as DriveStorage.put_many, on the same kind of thread pool."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+            return list(pool.map(self._upload, [source for source, _, _ in items]))
+
+
+class SlowDrive:
+    """
+    Replaces the download side of google_drive (get_file_metadata and
+    iter_file_chunks) for the proxy load test: every file is `size` bytes
+    and each call waits `delay` seconds, like a Drive round trip.
+    """
+
+    def __init__(self, size=2 * 1024 ** 2, delay=0.05):
+        self.size = size
+        self.delay = delay
+
+    def get_file_metadata(self, file_id, fields=None):
+        time.sleep(self.delay)
+        return {'id': file_id, 'name': f"{file_id}.glb", 'size': str(self.size),
+                'mimeType': 'model/gltf-binary'}
+
+    def iter_file_chunks(self, file_id, start=0, end=None, chunk_size=1024 * 1024):
+        end = self.size - 1 if end is None else min(end, self.size - 1)
+        offset = start
+        while offset <= end:
+            time.sleep(self.delay)
+            length = min(chunk_size, end - offset + 1)
+            yield bytes(length)
+            offset += length
+
+
+def fake_mongo():
+    """In-memory Mongo (mongomock), a fresh database per call."""
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("The benchmarks need mongomock: pip install -r benchmarks/requirements.txt")
+    return mongomock.MongoClient().benchmark
+
+
+def lead_summaries(texts, db=None, batch_size=None, summary_mode=None):
+    """
+    Cheap extractive stand-in for BART (first three sentences), used with
+    --fake-summarizer when the model isn't available or isn't under test.
+    """
+    summaries = []
+    for text in texts:
+        sentences = [s.strip() for s in text.replace('\n', ' ').split('.') if s.strip()]
+        summaries.append('. '.join(sentences[:3]) + '.')
+    return summaries
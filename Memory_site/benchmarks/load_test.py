@@ -0,0 +1,183 @@
+"""
+Concurrency load test for the Drive proxy route (/admin/serve_model).
+
+    cd Memory_site
+    python -m benchmarks.load_test --serve sync gevent      # local fake app, both worker types
+    python -m benchmarks.load_test --url http://127.0.0.1:8001 --probe-url http://127.0.0.1:8000
+
+With --serve, benchmarks.proxy_app (Drive replaced by a slow fake) is
+started under gunicorn once per worker class. Each concurrency level runs
+that many clients downloading models for --duration seconds while a probe
+fetches a light page (the login form) to show whether the UI is starved.
+Prints downloads/s, MB/s and p50/p95 latency per level.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import tempfile
+import urllib.request
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from benchmarks.run import percentile
+
+SITE_DIR = os.path.dirname(HERE)
+
+
+def fetch(url, timeout):
+    """(seconds, bytes read) for one GET, or (seconds, None) on any error."""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            size = 0
+            while True:
+                chunk = resp.read(256 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+    except Exception:
+        return time.perf_counter() - started, None
+    return time.perf_counter() - started, size
+
+
+def run_level(base_url, probe_url, concurrency, duration, timeout):
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    downloads, probes = [], []
+    counter = iter(range(10 ** 9))
+
+    def client():
+        while time.perf_counter() < deadline:
+            with lock:
+                n = next(counter)
+            # A new file id every time, so each request is a cache miss that goes to "Drive"
+            result = fetch(f"{base_url}/admin/serve_model/loadtest-{os.getpid()}-{concurrency}-{n}", timeout)
+            with lock:
+                downloads.append(result)
+
+    def probe():
+        while time.perf_counter() < deadline:
+            probes.append(fetch(f"{probe_url}/auth/login", timeout))
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    threads.append(threading.Thread(target=probe, daemon=True))
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ok = [(s, size) for s, size in downloads if size is not None]
+    ok_probes = [s for s, size in probes if size is not None]
+
+    def ms(values, pct):
+        value = percentile(values, pct)
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'concurrency': concurrency,
+        'downloads': len(ok),
+        'errors': len(downloads) - len(ok),
+        'downloads_per_s': round(len(ok) / elapsed, 2),
+        'mb_per_s': round(sum(size for _, size in ok) / elapsed / 1024 ** 2, 2),
+        'p50_ms': ms([s for s, _ in ok], 50),
+        'p95_ms': ms([s for s, _ in ok], 95),
+        'probe_p95_ms': ms(ok_probes, 95),
+        'probe_errors': len(probes) - len(ok_probes),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process, log_path, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with code {process.returncode}, see {log_path}")
+        try:
+            urllib.request.urlopen(url, timeout=2).close()
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise SystemExit(f"Server at {url} did not come up, see {log_path}")
+
+
+def serve(worker_class, workers, connections):
+    """Starts benchmarks.proxy_app under gunicorn with the proxy pool's config."""
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(SITE_DIR, 'deploy', 'gunicorn_proxy.py'),
+               '--bind', f"127.0.0.1:{port}", '--worker-class', worker_class, '--workers', str(workers),
+               '--worker-connections', str(connections), '--log-level', 'warning',
+               'benchmarks.proxy_app:app']
+    # The app logs a line per request; keep that out of the report
+    log_path = os.path.join(tempfile.gettempdir(), f"loadtest-{worker_class}-{port}.log")
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(command, cwd=SITE_DIR, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(f"{base_url}/auth/login", process, log_path)
+    return process, base_url
+
+
+def print_table(label, rows):
+    print(f"\n{label}")
+    print(f"{'clients':>8} {'dl/s':>8} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'UI p95 ms':>10}")
+    for r in rows:
+        print(f"{r['concurrency']:>8} {r['downloads_per_s']:>8} {r['mb_per_s']:>8} {r['p50_ms']!s:>9} "
+              f"{r['p95_ms']!s:>9} {r['errors']:>7} {r['probe_p95_ms']!s:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Base URL of a running proxy pool.')
+    parser.add_argument('--probe-url', help='Base URL whose login page is probed (default: --url).')
+    parser.add_argument('--serve', nargs='+', choices=['sync', 'gthread', 'gevent'],
+                        help='Start the fake app locally under these gunicorn worker classes.')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers with --serve.')
+    parser.add_argument('--worker-connections', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100, 200])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level.')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds.')
+    parser.add_argument('--out', default=None, help='Also write the results as JSON here.')
+    args = parser.parse_args(argv)
+    if not args.url and not args.serve:
+        parser.error('give --url or --serve')
+
+    results = {}
+    if args.url:
+        rows = [run_level(args.url, args.probe_url or args.url, c, args.duration, args.timeout)
+                for c in args.concurrency]
+        print_table(args.url, rows)
+        results[args.url] = rows
+    for worker_class in args.serve or []:
+        process, base_url = serve(worker_class, args.workers, args.worker_connections)
+        try:
+            rows = [run_level(base_url, args.probe_url or base_url, c, args.duration, args.timeout)
+                    for c in args.concurrency]
+        finally:
+            process.terminate()
+            process.wait()
+        print_table(f"{worker_class} x {args.workers} workers", rows)
+        results[worker_class] = rows
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump({'created_at': datetime.now().isoformat(), 'levels': results}, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+The real app with Drive and Mongo replaced by local fakes, for
+benchmarks.load_test. Serve it with either pool's settings:
+
+    gunicorn -c deploy/gunicorn_proxy.py benchmarks.proxy_app:app
+
+LOADTEST_MODEL_BYTES and LOADTEST_DRIVE_DELAY_MS shape the fake downloads.
+"""
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))  # Memory_site, so `app` imports
+
+# Every request asks for a new file id, so the model cache only costs disk here
+os.environ.setdefault('MODEL_CACHE_DIR', tempfile.mkdtemp(prefix='loadtest-cache-'))
+os.environ.setdefault('MONGO_URI', 'mongodb://127.0.0.1:27017/loadtest?serverSelectionTimeoutMS=200')
+
+from app import create_app, mongo
+from app.admin import routes as admin_routes
+from benchmarks.fakes import SlowDrive, fake_mongo
+
+app = create_app()
+mongo.db = fake_mongo()
+
+drive = SlowDrive(size=int(os.environ.get('LOADTEST_MODEL_BYTES') or 2 * 1024 ** 2),
+                  delay=float(os.environ.get('LOADTEST_DRIVE_DELAY_MS') or 50) / 1000)
+admin_routes.get_file_metadata = drive.get_file_metadata
+admin_routes.iter_file_chunks = drive.iter_file_chunks
@@ -0,0 +1,219 @@
+"""
+Stage-level benchmarks for the asset pipeline.
+
+    cd Memory_site
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run                       # real BART if it loads
+    python -m benchmarks.run --fake-summarizer     # everything but the model
+    python -m benchmarks.run --compare results/a.json results/b.json
+
+Each document of a synthetic corpus goes through every stage separately
+(extraction, summarization, texture, GLB, thumbnails, upload), then the
+whole corpus runs end to end through pipeline.process_files. Mongo is
+a local fake, and files go to a fake Drive or to the real local store
+(--storage local). Results (p50/p95 per stage, docs/sec, peak RSS) are
+printed and written as JSON under benchmarks/results/.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))  # Memory_site, so `app` imports
+
+from benchmarks.corpus import build_corpus, SIZES
+from benchmarks.fakes import FakeDrive, fake_mongo, lead_summaries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = (len(ordered) - 1) * pct / 100
+    low, high = int(index), min(int(index) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize_timings(seconds, docs=None):
+    docs = docs if docs is not None else len(seconds)
+    total = sum(seconds)
+    return {
+        'runs': len(seconds),
+        'p50_ms': round(percentile(seconds, 50) * 1000, 2),
+        'p95_ms': round(percentile(seconds, 95) * 1000, 2),
+        'total_s': round(total, 3),
+        'docs_per_s': round(docs / total, 2) if total else None,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    from app.services import pipeline
+    from app.services.model_generator import card_texture, build_card_glb
+    from app.services.thumbnails import pdf_thumbnails, image_thumbnails
+    from app.services.workspace import JobWorkspace
+    from app.services.storage import LocalStorage
+
+    corpus = build_corpus(args.corpus_dir, docs_per_size=args.docs, sizes=args.sizes)
+    if args.storage == 'local':
+        storage = LocalStorage(tempfile.mkdtemp(prefix='bench-storage-'))
+    else:
+        storage = FakeDrive(tempfile.mkdtemp(prefix='bench-drive-'), latency=args.drive_latency / 1000)
+    storage_db = fake_mongo()
+    if args.fake_summarizer:
+        pipeline.summarize_texts = lead_summaries
+
+    stages = {name: [] for name in ('extract', 'summarize', 'texture', 'glb', 'thumbnails', 'upload')}
+    by_size = {}
+    print(f"Corpus: {len(corpus)} documents ({', '.join(args.sizes)}), "
+          f"summarizer: {'lead-3 fake' if args.fake_summarizer else 'BART'}, repeats: {args.repeats}")
+
+    for _ in range(args.repeats):
+        for path, kind, size_name in corpus:
+            with open(path, 'rb') as f:
+                data = f.read()
+            filename = os.path.basename(path)
+
+            t_extract, text = timed(pipeline.extract_upload_text, data, filename,
+                                    pipeline.token_budget_for(args.summary_mode), args.extract_workers)
+            # A fresh fake db per document so the chunk cache never hides model time
+            t_summary, summaries = timed(pipeline.summarize_texts, [text], fake_mongo(),
+                                         batch_size=args.batch_size, summary_mode=args.summary_mode)
+            t_texture, (texture, mime_type) = timed(card_texture, summaries[0])
+            t_glb, glb = timed(build_card_glb, texture, mime_type)
+            if kind == 'pdf':
+                t_thumbs, _ = timed(pdf_thumbnails, data)
+            else:
+                t_thumbs, _ = timed(image_thumbnails, texture)
+            t_upload, _ = timed(storage.put_many, storage_db, [(data, filename, 'application/octet-stream'),
+                                                               (glb, filename + '.glb', 'model/gltf-binary')])
+
+            for name, value in (('extract', t_extract), ('summarize', t_summary), ('texture', t_texture),
+                                ('glb', t_glb), ('thumbnails', t_thumbs), ('upload', t_upload)):
+                stages[name].append(value)
+            by_size.setdefault(size_name, []).append(
+                t_extract + t_summary + t_texture + t_glb + t_thumbs + t_upload)
+
+    # End to end: the whole corpus as one job, with dedup and batching as in production
+    end_to_end = []
+    for _ in range(args.repeats):
+        db = fake_mongo()
+        files = [(index, path, os.path.basename(path)) for index, (path, _, _) in enumerate(corpus)]
+        with JobWorkspace('benchmark', in_memory=args.in_memory) as workspace:
+            seconds, outcomes = timed(lambda: list(pipeline.process_files(
+                files, '0,0', '1', 'BENCH', db, batch_size=args.batch_size, summary_mode=args.summary_mode,
+                upload_workers=args.upload_workers, extract_workers=args.extract_workers,
+                workspace=workspace, storage=storage)))
+        failures = [str(error) for _, _, error in outcomes if error]
+        if failures:
+            print(f"End-to-end run had {len(failures)} failure(s), first: {failures[0]}")
+        end_to_end.append(seconds)
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'settings': {
+            'docs_per_size': args.docs, 'sizes': {s: SIZES[s] for s in args.sizes}, 'repeats': args.repeats,
+            'summary_mode': args.summary_mode, 'fake_summarizer': args.fake_summarizer,
+            'batch_size': args.batch_size, 'extract_workers': args.extract_workers,
+            'upload_workers': args.upload_workers, 'drive_latency_ms': args.drive_latency,
+            'in_memory': args.in_memory, 'storage': args.storage,
+        },
+        'stages': {name: summarize_timings(values) for name, values in stages.items()},
+        'per_size': {name: summarize_timings(values) for name, values in by_size.items()},
+        'end_to_end': summarize_timings(end_to_end, docs=len(corpus) * args.repeats),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def print_report(result):
+    print(f"\n{'stage':<12} {'p50 ms':>10} {'p95 ms':>10} {'docs/s':>10}")
+    for section in ('stages', 'per_size'):
+        for name, row in result[section].items():
+            print(f"{name:<12} {row['p50_ms']:>10} {row['p95_ms']:>10} {row['docs_per_s']:>10}")
+    row = result['end_to_end']
+    print(f"{'end_to_end':<12} {'':>10} {'':>10} {row['docs_per_s']:>10}   ({row['total_s']}s per corpus run)")
+    print(f"peak RSS: {result['peak_rss_mb']} MB")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'stage':<12} {'old':>10} {'new':>10} {'change':>9}")
+    for name, before in old['stages'].items():
+        after = new['stages'].get(name)
+        if after:
+            change = (after['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            print(f"{name:<12} {before['p50_ms']:>10} {after['p50_ms']:>10} {change:>+8.1f}%   (p50 ms)")
+    before, after = old['end_to_end']['docs_per_s'], new['end_to_end']['docs_per_s']
+    change = (after - before) / before * 100 if before else 0.0
+    print(f"{'end_to_end':<12} {before:>10} {after:>10} {change:>+8.1f}%   (docs/s)")
+    print(f"{'peak RSS MB':<12} {old['peak_rss_mb']:>10} {new['peak_rss_mb']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=3, help='Documents per size and type.')
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES), choices=list(SIZES))
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--summary-mode', default='chunked', choices=['chunked', 'truncate'])
+    parser.add_argument('--fake-summarizer', action='store_true', help='Use a lead-3 stand-in for BART.')
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--extract-workers', type=int, default=0)
+    parser.add_argument('--upload-workers', type=int, default=40)
+    parser.add_argument('--storage', default='drive', choices=['drive', 'local'],
+                        help='Fake Drive, or the local content-addressed store.')
+    parser.add_argument('--drive-latency', type=float, default=0.0, help='Simulated ms per Drive upload.')
+    parser.add_argument('--in-memory', action='store_true', help='Use an in-memory job workspace.')
+    parser.add_argument('--corpus-dir', default=os.path.join(HERE, '.corpus'))
+    parser.add_argument('--out', default=None, help='JSON output path (default: benchmarks/results/<time>.json).')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run(args)
+    print_report(result)
+
+    out = args.out or os.path.join(HERE, 'results', datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
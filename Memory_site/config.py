@@ -9,8 +9,99 @@ class Config:
     MONGO_URI = os.environ.get('MONGO_URI') or \
         ''
     MAIL_SERVER = ''
-    MAIL_PORT = 
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
     MAIL_USE_TLS = True
     MAIL_USERNAME = ''
     MAIL_PASSWORD = '' # Use an App Password
     MAIL_DEFAULT_SENDER = ''
+
+    # --- LOGIN ---
+    # Logged-in users are kept in memory this long instead of re-read on every request.
+    # The cache is per process and only the process handling a password reset drops
+    # the user, so keep this short: it is how long other workers may serve a stale one.
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 5)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+
+    # --- BACKGROUND JOB QUEUE ---
+    # Uploads are spooled here until a worker from `flask run-workers` picks them up.
+    JOB_SPOOL_DIR = os.environ.get('JOB_SPOOL_DIR') or os.path.join('temp', 'jobs')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL') or 2.0)
+    # A running job with no heartbeat for this long is handed to another worker
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS') or 900)
+    # Per-job scratch directories are created under this root (tmpfs /dev/shm when empty)
+    WORKSPACE_ROOT = os.environ.get('WORKSPACE_ROOT') or None
+    # Keep generated cards in memory instead of in a scratch directory
+    WORKSPACE_IN_MEMORY = (os.environ.get('WORKSPACE_IN_MEMORY') or '').lower() in ('1', 'true', 'yes')
+
+    # --- SUMMARIZATION ---
+    # Documents summarized together in one model.generate call
+    SUMMARY_BATCH_SIZE = int(os.environ.get('SUMMARY_BATCH_SIZE') or 4)
+    # 'chunked' summarizes the whole document (map-reduce over 1024-token windows),
+    # 'truncate' only reads the first 1024 tokens like the original pipeline.
+    SUMMARY_MODE = os.environ.get('SUMMARY_MODE') or 'chunked'
+    # Can point at a distilled checkpoint such as sshleifer/distilbart-cnn-12-6
+    SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL') or 'facebook/bart-large-cnn'
+    # How the model is run: torch, torch-int8 or onnx (see summarizer_backends.BACKENDS)
+    SUMMARY_BACKEND = os.environ.get('SUMMARY_BACKEND') or 'torch'
+    # When set (e.g. http://127.0.0.1:8765), summaries come from the shared model
+    # server started with `flask summary-server` instead of each worker process.
+    SUMMARY_SERVER_URL = os.environ.get('SUMMARY_SERVER_URL') or None
+    SUMMARY_SERVER_TIMEOUT = float(os.environ.get('SUMMARY_SERVER_TIMEOUT') or 600)
+    # Exported ONNX graphs for SUMMARY_BACKEND=onnx, so the export only happens once
+    ONNX_CACHE_DIR = os.environ.get('ONNX_CACHE_DIR') or os.path.join('temp', 'onnx')
+
+    # --- MODEL PROXY CACHE (/admin/serve_model) ---
+    MODEL_CACHE_DIR = os.environ.get('MODEL_CACHE_DIR') or os.path.join('temp', 'model_cache')
+    # Shared by every process using MODEL_CACHE_DIR, not per worker
+    MODEL_CACHE_DISK_BYTES = int(os.environ.get('MODEL_CACHE_DISK_BYTES') or 2 * 1024 ** 3)
+    MODEL_CACHE_MEMORY_BYTES = int(os.environ.get('MODEL_CACHE_MEMORY_BYTES') or 64 * 1024 ** 2)
+    # Only models up to this size are kept in the in-memory tier
+    MODEL_CACHE_MEMORY_ITEM_BYTES = int(os.environ.get('MODEL_CACHE_MEMORY_ITEM_BYTES') or 4 * 1024 ** 2)
+    MODEL_CACHE_MAX_AGE = int(os.environ.get('MODEL_CACHE_MAX_AGE') or 365 * 24 * 3600)
+    # Bytes fetched from Drive per ranged request when streaming a cache miss
+    DRIVE_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DRIVE_DOWNLOAD_CHUNK_SIZE') or 1024 * 1024)
+    # Cap on concurrent Drive uploads per job (resumable, retried with backoff).
+    # Every file of a batch up to this many goes up at once, so a batch takes
+    # about as long as its slowest file; larger ones go up in waves.
+    DRIVE_UPLOAD_WORKERS = int(os.environ.get('DRIVE_UPLOAD_WORKERS') or 40)
+
+    # --- FILE STORAGE ---
+    # 'drive' (Google Drive only), 'local' (content-addressed files under
+    # STORAGE_ROOT, no Google account needed) or 'tiered' (local first,
+    # copied to Drive in the background; `flask replicate-storage` catches up)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'drive'
+    STORAGE_ROOT = os.environ.get('STORAGE_ROOT') or os.path.join('temp', 'storage')
+    STORAGE_REPLICATION_WORKERS = int(os.environ.get('STORAGE_REPLICATION_WORKERS') or 2)
+    # Stored files are addressed by content hash, so they never change
+    STORAGE_MAX_AGE = int(os.environ.get('STORAGE_MAX_AGE') or 365 * 24 * 3600)
+
+    # --- LIBRARY VIEWS (/admin/materials, /admin/models) ---
+    ASSETS_PAGE_SIZE = int(os.environ.get('ASSETS_PAGE_SIZE') or 60)
+
+    # --- PUBLIC API (/api) ---
+    # How far from a campus the AR app may be and still get its assets
+    NEAREST_RADIUS_METERS = float(os.environ.get('NEAREST_RADIUS_METERS') or 2000)
+    NEAREST_MAX_RADIUS_METERS = float(os.environ.get('NEAREST_MAX_RADIUS_METERS') or 50000)
+    NEAREST_ASSET_LIMIT = int(os.environ.get('NEAREST_ASSET_LIMIT') or 500)
+    # Thumbnails are addressed by content hash, so they can be cached for good
+    THUMBNAIL_MAX_AGE = int(os.environ.get('THUMBNAIL_MAX_AGE') or 365 * 24 * 3600)
+    # Widths rendered at upload time (comma separated); the endpoint serves the closest one
+    THUMBNAIL_WIDTHS = tuple(int(w) for w in (os.environ.get('THUMBNAIL_WIDTHS') or '160,320,640').split(','))
+
+    # --- 3D CARDS ---
+    CARD_FONT = os.environ.get('CARD_FONT') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'TASAExplorer-Medium.ttf')
+    # 'png', 'jpeg' or 'webp' (webp cards use the EXT_texture_webp glTF extension)
+    CARD_TEXTURE_FORMAT = (os.environ.get('CARD_TEXTURE_FORMAT') or 'png').lower()
+    # Cards use the largest mip level no wider than this (the texture is 1024 wide)
+    CARD_TEXTURE_MAX_WIDTH = int(os.environ.get('CARD_TEXTURE_MAX_WIDTH') or 1024)
+
+    # --- TEXT EXTRACTION ---
+    # Processes used to extract large PDFs in page ranges (0/1 = extract in-process).
+    # What gets read depends on SUMMARY_MODE:
+    #   chunked:  the whole document is needed, so PDFs of PARALLEL_MIN_PAGES (40)
+    #             pages or more are split across EXTRACT_WORKERS processes
+    #   truncate: only the first 1024 tokens are summarized, so pages are read one
+    #             at a time and extraction stops early; EXTRACT_WORKERS is unused
+    EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS') or 0)
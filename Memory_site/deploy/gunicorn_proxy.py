@@ -0,0 +1,32 @@
+# Proxy pool: /admin/serve_model (GLB downloads from Drive) and the /api
+# routes the AR app calls.
+#
+#   gunicorn -c deploy/gunicorn_proxy.py run:app
+#
+# These requests spend nearly all their time waiting on Drive, Mongo or the
+# client, so each process runs them on green threads (gevent) and holds
+# hundreds at once instead of one per worker. benchmarks/load_test.py shows
+# how this scales against sync workers.
+import os
+import multiprocessing
+
+bind = os.environ.get('PROXY_BIND') or '127.0.0.1:8001'
+worker_class = 'gevent'
+workers = int(os.environ.get('PROXY_WORKERS') or max(2, multiprocessing.cpu_count() // 2))
+# Concurrent requests per worker process
+worker_connections = int(os.environ.get('PROXY_WORKER_CONNECTIONS') or 500)
+# gevent workers keep heartbeating while they stream, so a long download
+# isn't killed by this; it only catches a stuck process
+timeout = int(os.environ.get('PROXY_TIMEOUT') or 60)
+graceful_timeout = 30
+keepalive = 5
+# Not preloaded: gevent patches sockets and locks when the worker starts, and
+# the Mongo client, Drive service and model cache must be created after that
+preload_app = False
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges from the shared metrics directory
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
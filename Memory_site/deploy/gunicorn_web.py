@@ -0,0 +1,26 @@
+# Web pool: the admin UI, logins and upload requests.
+#
+#   gunicorn -c deploy/gunicorn_web.py run:app
+#
+# Uploads only spool files and queue a job here; the CPU-heavy work
+# (extraction, BART, cards) runs in `flask run-workers`. Long Drive downloads
+# are routed to the evented pool in gunicorn_proxy.py (see nginx.conf), so
+# slow clients can't tie these workers up.
+import os
+import multiprocessing
+
+bind = os.environ.get('WEB_BIND') or '127.0.0.1:8000'
+worker_class = 'sync'
+workers = int(os.environ.get('WEB_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+# Big uploads on a slow link take a while to come in
+timeout = int(os.environ.get('WEB_TIMEOUT') or 120)
+graceful_timeout = 30
+# The Mongo client and the Drive service are created per worker, after the fork
+preload_app = False
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges from the shared metrics directory
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
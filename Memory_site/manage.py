@@ -1,3 +1,4 @@
+import click
 from app import create_app, mongo
 from werkzeug.security import generate_password_hash
 
@@ -24,4 +25,150 @@ def init_db():
             'password_hash': hashed_password,
             'role': 'admin'
         })
-        print("Default admin user 'admin123' created successfully.")
\ No newline at end of file
+        print("Default admin user 'admin123' created successfully.")
+
+@app.cli.command("backfill-asset-fields")
+def backfill_asset_fields():
+    """Adds indexed fields, college GeoJSON points and manifest versions to older documents."""
+    from app.services.asset_queries import backfill_typed_fields
+
+    from app.services.manifest import backfill_versions
+
+    assets, colleges = backfill_typed_fields(mongo.db)
+    versioned = backfill_versions(mongo.db)
+    print(f"Backfilled {assets} asset(s) and {colleges} college(s); versioned {versioned} asset(s).")
+
+
+def _ensure_indexes():
+    """Builds the indexes; returns how many failed. Unreachable Mongo is a ClickException."""
+    from pymongo.errors import PyMongoError
+    from app.indexes import ensure_indexes
+
+    try:
+        return ensure_indexes()
+    except PyMongoError as e:
+        raise click.ClickException(f"Could not reach Mongo: {e}")
+
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Creates the Mongo indexes the app relies on (run after deploys; safe to repeat)."""
+    failed = _ensure_indexes()
+    if failed:
+        raise click.ClickException(f"{failed} index(es) could not be created, see the log above.")
+    print("Indexes are up to date.")
+
+
+@app.cli.command("import-assets")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--college", required=True, help="College name, as saved in the admin panel.")
+@click.option("--semester", required=True)
+@click.option("--branch", required=True)
+@click.option("--workers", type=int, default=1, help="Pipeline processes.")
+@click.option("--batch-files", type=int, default=8, help="Files per pipeline batch.")
+def import_assets(directory, college, semester, branch, workers, batch_files):
+    """Imports every PDF/PPT under DIRECTORY; rerun the same command to resume."""
+    from app.services.bulk_import import run_import
+
+    college_doc = mongo.db.colleges.find_one({'college_name': college}, {'coordinate': 1})
+    if not college_doc:
+        raise click.ClickException(f"No college named '{college}'.")
+
+    stats = run_import(directory, college_doc['coordinate'], semester, branch,
+                       workers=workers, batch_files=batch_files)
+    seconds = stats['seconds'] or 1e-9
+    processed = stats['done'] + stats['failed']
+    print(f"Done in {stats['seconds']}s: {stats['done']} imported ({stats['duplicates']} duplicates), "
+          f"{stats['failed']} failed, {stats['skipped']} skipped from earlier runs.")
+    print(f"Throughput: {processed / seconds:.2f} files/s, {stats['bytes'] / seconds / 1024 ** 2:.2f} MB/s.")
+
+
+@app.cli.command("replicate-storage")
+def replicate_storage():
+    """Copies files a tiered store hasn't put on Drive yet (e.g. after a restart)."""
+    from app.services.storage import get_storage, replicate_pending, TieredStorage
+
+    storage = get_storage()
+    if not isinstance(storage, TieredStorage):
+        raise click.ClickException("Only the 'tiered' STORAGE_BACKEND replicates to Drive.")
+    copied, failed = replicate_pending(mongo.db, storage)
+    print(f"Replicated {copied} file(s) to Drive, {failed} failed (rerun to retry).")
+
+
+@app.cli.command("run-workers")
+@click.option("--workers", "num_workers", type=int, default=None,
+              help="Number of worker processes (defaults to JOB_WORKERS).")
+def run_workers(num_workers):
+    """Starts the local worker pool that drains the upload job queue."""
+    from app.services.job_queue import start_worker_pool
+    from app.services.ai_summarizer import server_health
+
+    # With a model server configured every job depends on it, so don't start
+    # workers that would only fail each summary.
+    server_url = app.config['SUMMARY_SERVER_URL']
+    if server_url:
+        health = server_health()
+        if not health or health.get('status') == 'error':
+            raise click.ClickException(f"Summary server at {server_url} is not healthy: "
+                                       f"{health or 'unreachable'}. Start it with `flask summary-server`.")
+
+    # Make sure the indexes exist before taking jobs. An index that can't be
+    # built, e.g. a unique one over duplicate rows, only costs speed, so start anyway.
+    failed = _ensure_indexes()
+    if failed:
+        print(f"Warning: {failed} index(es) could not be created (see `flask ensure-indexes`).")
+
+    num_workers = num_workers or app.config['JOB_WORKERS']
+    print(f"Starting {num_workers} upload worker(s)...")
+    start_worker_pool(num_workers)
+
+
+@app.cli.command("summary-server")
+@click.option("--host", default="127.0.0.1", help="Interface to bind (keep it local).")
+@click.option("--port", type=int, default=8765)
+@click.option("--warm/--lazy", default=False,
+              help="Load and warm up the model at start instead of on the first request.")
+def summary_server(host, port, warm):
+    """Runs the shared BART model server used when SUMMARY_SERVER_URL is set."""
+    from app.services.summary_server import serve
+
+    serve(host=host, port=port, warm=warm)
+
+
+@app.cli.command("compare-summarizers")
+@click.argument("files", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--candidate", "candidates", multiple=True, default=["torch-int8", "onnx"],
+              help="Backend to compare, optionally as backend:model (repeatable).")
+@click.option("--reference-model", default="facebook/bart-large-cnn")
+@click.option("--batch-size", type=int, default=4)
+@click.option("--json-out", type=click.Path(), default=None, help="Also write the results as JSON.")
+def compare_summarizers(files, candidates, reference_model, batch_size, json_out):
+    """Compares latency, memory and ROUGE drift of summarization backends."""
+    import json
+    from app.services.pipeline import read_upload_text
+    from app.services.summarizer_backends import compare_backends
+
+    texts = []
+    for path in files:
+        if path.lower().endswith(('.pdf', '.ppt', '.pptx')):
+            texts.append(read_upload_text(path, path))
+        else:
+            with open(path, encoding='utf-8', errors='ignore') as f:
+                texts.append(f.read())
+
+    parsed = []
+    for candidate in candidates:
+        backend, _, model = candidate.partition(':')
+        parsed.append((backend, model or reference_model))
+
+    results = compare_backends(texts, parsed, reference=('torch', reference_model), max_batch_size=batch_size)
+
+    columns = ['backend', 'model', 'load_seconds', 'seconds_per_doc', 'rss_model_mb', 'rss_peak_mb',
+               'rouge1', 'rouge2', 'rougeL']
+    print(" | ".join(columns))
+    for row in results:
+        print(" | ".join(str(row.get(col, '-')) for col in columns))
+
+    if json_out:
+        with open(json_out, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,7 +1,17 @@
 # This file's only job is to create and run the app.
+#
+# In production it is served by two gunicorn pools (see deploy/):
+#   gunicorn -c deploy/gunicorn_web.py run:app     # admin UI and uploads, sync workers
+#   gunicorn -c deploy/gunicorn_proxy.py run:app   # Drive downloads and /api, gevent workers
+#   flask run-workers                              # upload processing
+#   flask ensure-indexes                           # once per deploy, fails loudly on a bad index
 from app import create_app
+from app.indexes import ensure_indexes_in_background
 
 app = create_app()
+# Queries like /api/nearest's $geoNear need their indexes; build any missing
+# ones without holding up the boot (run-workers does the same)
+ensure_indexes_in_background(app)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
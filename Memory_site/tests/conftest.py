@@ -0,0 +1,34 @@
+import mongomock
+import pytest
+from app import create_app, mongo
+from app.services import model_cache
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    MONGO_URI = 'mongodb://localhost:27017/test'
+    STORAGE_BACKEND = 'local'
+    SUMMARY_SERVER_URL = None
+    EXTRACT_WORKERS = 0
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Settings(TestConfig):
+        JOB_SPOOL_DIR = str(tmp_path / 'jobs')
+        STORAGE_ROOT = str(tmp_path / 'storage')
+        MODEL_CACHE_DIR = str(tmp_path / 'model_cache')
+
+    app = create_app(Settings)
+    # Every test gets its own in-memory database
+    mongo.db = mongomock.MongoClient().db
+    # Process-wide caches would otherwise outlive the test's directories
+    model_cache._cache = None
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db(app):
+    return mongo.db
@@ -0,0 +1,62 @@
+import pytest
+from app.services import pipeline
+from app.services.bulk_import import import_batch
+
+
+@pytest.fixture
+def fake_pipeline(app, monkeypatch):
+    batches = []
+
+    def fake_summarize(texts, db, batch_size=None, summary_mode=None):
+        batches.append(list(texts))
+        return [f"Summary of {text}" for text in texts]
+    monkeypatch.setattr(pipeline, 'summarize_texts', fake_summarize)
+    monkeypatch.setattr(pipeline, 'extract_upload_text',
+                        lambda data, filename, token_budget=None, extract_workers=0: data.decode('utf-8'))
+    return batches
+
+
+def _batch(db, tmp_path):
+    paths = []
+    for name, text in (('a.pptx', 'Photosynthesis notes'), ('b.pptx', 'Cell division notes')):
+        path = tmp_path / name
+        path.write_bytes(text.encode('utf-8'))
+        paths.append(str(path))
+        db.import_files.insert_one({'import_id': 'imp', 'path': str(path), 'status': 'pending'})
+    return paths
+
+
+def test_batches_are_checkpointed_per_file(db, tmp_path, fake_pipeline):
+    paths = _batch(db, tmp_path)
+
+    outcomes, size = import_batch('imp', paths, '12.9,77.5', 'Sem 1', 'CSE')
+
+    assert [error for _, _, error in outcomes] == [None, None]
+    assert size == len('Photosynthesis notes') + len('Cell division notes')
+    assert db.import_files.count_documents({'import_id': 'imp', 'status': 'done'}) == 2
+
+
+def test_rerun_does_not_duplicate_an_unrecorded_asset(db, tmp_path, fake_pipeline):
+    paths = _batch(db, tmp_path)
+    import_batch('imp', paths, '12.9,77.5', 'Sem 1', 'CSE')
+    # Killed after a.pptx's asset was saved but before its checkpoint
+    db.import_files.update_one({'path': paths[0]}, {'$set': {'status': 'pending', 'asset_id': None}})
+    fake_pipeline.clear()
+
+    outcomes, _ = import_batch('imp', [paths[0]], '12.9,77.5', 'Sem 1', 'CSE')
+
+    asset = db.assets.find_one({'filename': 'a.pptx'})
+    assert outcomes == [(paths[0], {'asset_id': str(asset['_id']), 'duplicate_of': None}, None)]
+    assert fake_pipeline == []
+    assert db.assets.count_documents({}) == 2
+    assert db.import_files.find_one({'path': paths[0]})['status'] == 'done'
+
+
+def test_same_file_for_another_semester_is_imported(db, tmp_path, fake_pipeline):
+    paths = _batch(db, tmp_path)
+    import_batch('imp', paths, '12.9,77.5', 'Sem 1', 'CSE')
+
+    outcomes, _ = import_batch('imp', [paths[0]], '12.9,77.5', 'Sem 2', 'CSE')
+
+    assert outcomes[0][1]['duplicate_of'] is not None
+    assert db.assets.count_documents({'filename': 'a.pptx'}) == 2
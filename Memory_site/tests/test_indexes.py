@@ -0,0 +1,19 @@
+from app.indexes import ensure_indexes, ensure_indexes_in_background
+
+
+def test_indexes_are_built_in_the_background(app, db):
+    ensure_indexes_in_background(app).join(timeout=10)
+
+    assert 'location_2dsphere' in db.colleges.index_information()
+    assert 'content_hash_1' in db.assets.index_information()
+
+
+def test_one_failing_index_does_not_stop_the_rest(app, db):
+    # Duplicate usernames make the unique index impossible
+    db.users.insert_many([{'username': 'sam', 'email': 'a@example.com'},
+                         {'username': 'sam', 'email': 'b@example.com'}])
+
+    failed = ensure_indexes()
+
+    assert failed == 1
+    assert 'email_1' in db.users.index_information()
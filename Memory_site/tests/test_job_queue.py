@@ -0,0 +1,80 @@
+import os
+from bson.objectid import ObjectId
+from pymongo.errors import PyMongoError
+from app.services import job_queue, pipeline
+
+
+def _queued_job(db, tmp_path, filenames):
+    spool = tmp_path / 'jobs' / 'job'
+    spool.mkdir(parents=True)
+    files = []
+    for index, name in enumerate(filenames):
+        path = spool / f'{index}_{name}'
+        path.write_bytes(b'data')
+        files.append({'filename': name, 'path': str(path), 'status': 'queued', 'error': None,
+                      'summary': None, 'glb_key': None, 'glb_id': None, 'asset_id': None,
+                      'duplicate_of': None})
+    job_id = ObjectId()
+    db.jobs.insert_one({'_id': job_id, 'status': 'queued', 'coordinate': [0, 0], 'semester': 1,
+                        'branch': 'CSE', 'files': files, 'total': len(files), 'completed': 0,
+                        'failed': 0, 'spool_dir': str(spool), 'created_at': job_queue._now(),
+                        'heartbeat_at': None, 'worker': None})
+    return job_id
+
+
+def _run(monkeypatch, tmp_path, results):
+    def fake_process_files(pending, *args, **kwargs):
+        for item in results:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    monkeypatch.setattr(pipeline, 'process_files', fake_process_files)
+    job = job_queue.claim_next_job('w1', 60)
+    try:
+        job_queue.run_job(job, 4, 'chunked', 1, 0, workspace_root=str(tmp_path), lease_seconds=60)
+    except Exception as e:
+        job_queue.fail_job(job['_id'], 'w1', e)
+    return job['_id']
+
+
+def test_job_finishes_with_per_file_results(db, tmp_path, monkeypatch):
+    job_id = _queued_job(db, tmp_path, ['a.pdf', 'b.pdf'])
+    _run(monkeypatch, tmp_path, [(0, {'summary': 'ok'}, None), (1, None, 'broken file')])
+
+    job = db.jobs.find_one({'_id': job_id})
+    assert job['status'] == 'done'
+    assert (job['completed'], job['failed']) == (1, 1)
+    assert [f['status'] for f in job['files']] == ['done', 'failed']
+    assert not os.path.exists(job['spool_dir'])
+
+
+def test_job_fails_when_every_file_fails(db, tmp_path, monkeypatch):
+    job_id = _queued_job(db, tmp_path, ['a.pdf'])
+    _run(monkeypatch, tmp_path, [(0, None, 'broken file')])
+
+    assert db.jobs.find_one({'_id': job_id})['status'] == 'failed'
+
+
+def test_crash_fails_unfinished_files_and_removes_spool(db, tmp_path, monkeypatch):
+    job_id = _queued_job(db, tmp_path, ['a.pdf', 'b.pdf', 'c.pdf'])
+    _run(monkeypatch, tmp_path, [(0, {'summary': 'ok'}, None), PyMongoError('storage down')])
+
+    job = db.jobs.find_one({'_id': job_id})
+    assert job['status'] == 'failed'
+    assert (job['completed'], job['failed']) == (1, 2)
+    assert [f['status'] for f in job['files']] == ['done', 'failed', 'failed']
+    assert job['files'][1]['error'] == 'storage down'
+    assert not os.path.exists(job['spool_dir'])
+
+
+def test_crash_after_reclaim_leaves_job_alone(db, tmp_path, monkeypatch):
+    job_id = _queued_job(db, tmp_path, ['a.pdf'])
+    job = job_queue.claim_next_job('w1', 60)
+    db.jobs.update_one({'_id': job_id}, {'$set': {'worker': 'w2'}})
+
+    job_queue.fail_job(job['_id'], 'w1', RuntimeError('boom'))
+
+    job = db.jobs.find_one({'_id': job_id})
+    assert job['status'] == 'running'
+    assert job['failed'] == 0
+    assert os.path.exists(job['spool_dir'])
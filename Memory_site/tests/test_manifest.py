@@ -0,0 +1,75 @@
+import time
+import pytest
+from pymongo.errors import DuplicateKeyError
+from app.services import manifest
+from app.services.manifest import reserve_versions, committed_version, COUNTER_ID
+
+
+def test_versions_are_consecutive(db):
+    with reserve_versions(db) as first:
+        pass
+    with reserve_versions(db, 3) as last:
+        pass
+
+    assert (first, last) == (1, 4)
+    assert committed_version(db) == 4
+
+
+def test_readers_stop_below_an_unfinished_write(db):
+    with reserve_versions(db) as first:
+        with reserve_versions(db, 2) as second:
+            assert committed_version(db) == first - 1
+        # The later write finished, but the earlier one still holds readers back
+        assert committed_version(db) == first - 1
+    assert committed_version(db) == second
+
+
+def test_failed_write_releases_its_versions(db):
+    with pytest.raises(RuntimeError):
+        with reserve_versions(db):
+            raise RuntimeError('insert failed')
+
+    assert committed_version(db) == 1
+    assert db.counters.find_one({'_id': COUNTER_ID})['pending'] == {}
+
+
+def test_abandoned_reservations_expire(db, monkeypatch):
+    manifest._reserve(db, 1)
+    assert committed_version(db) == 0
+
+    later = time.time() + manifest.RESERVATION_SECONDS + 1
+    monkeypatch.setattr(manifest.time, 'time', lambda: later)
+
+    assert committed_version(db) == 1
+    # The next finished write clears the abandoned entry
+    with reserve_versions(db):
+        pass
+    assert db.counters.find_one({'_id': COUNTER_ID})['pending'] == {}
+
+
+def test_counter_without_seq_starts_from_zero(db):
+    db.counters.insert_one({'_id': COUNTER_ID})
+
+    with reserve_versions(db, 2) as last:
+        pass
+
+    assert last == 2
+
+
+def test_lost_create_race_is_retried(db, monkeypatch):
+    counters = db.counters
+    original = counters.find_one_and_update
+    calls = []
+
+    def racing(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            # Another process created the counter between our lookup and insert
+            counters.insert_one({'_id': COUNTER_ID, 'seq': 5, 'pending': {}})
+            raise DuplicateKeyError('E11000 duplicate key error')
+        return original(*args, **kwargs)
+    monkeypatch.setattr(type(counters), 'find_one_and_update',
+                        lambda self, *args, **kwargs: racing(*args, **kwargs))
+
+    assert manifest._reserve(db, 1)[1:] == (6, 6)
+    assert len(calls) == 2
@@ -0,0 +1,22 @@
+def test_queue_depth_is_counted_at_scrape_time(app, db):
+    db.jobs.insert_many([{'status': 'queued'}, {'status': 'queued'}, {'status': 'running'}, {'status': 'done'}])
+    client = app.test_client()
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'memory_site_job_queue_depth{status="queued"} 2.0' in body
+    assert 'memory_site_job_queue_depth{status="running"} 1.0' in body
+
+    db.jobs.update_many({'status': 'queued'}, {'$set': {'status': 'done'}})
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'memory_site_job_queue_depth{status="queued"} 0.0' in body
+
+
+def test_queue_depth_is_left_out_when_mongo_fails(app, db, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError('mongo down')
+    monkeypatch.setattr(type(db.jobs), 'aggregate', broken)
+
+    response = app.test_client().get('/metrics')
+
+    assert response.status_code == 200
+    assert 'memory_site_job_queue_depth{' not in response.get_data(as_text=True)
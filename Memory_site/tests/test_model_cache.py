@@ -0,0 +1,29 @@
+import os
+from io import BytesIO
+from app.services.model_cache import ModelCache
+
+
+def _cache(directory):
+    return ModelCache(str(directory), disk_max_bytes=250, memory_max_bytes=0, memory_item_max_bytes=0)
+
+
+def test_disk_bound_is_shared_between_processes(tmp_path):
+    # Two caches on one directory stand in for two worker processes
+    first, second = _cache(tmp_path), _cache(tmp_path)
+
+    first.put('a', BytesIO(b'x' * 100))
+    second.put('b', BytesIO(b'x' * 100))
+    os.utime(tmp_path / 'a', (1, 1))
+    first.put('c', BytesIO(b'x' * 100))
+
+    assert sorted(name for name in os.listdir(tmp_path) if not name.endswith('.etag')) == ['b', 'c']
+
+
+def test_disk_entries_are_served(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put('a', BytesIO(b'x' * 100))
+
+    entry = cache.get('a')
+
+    assert entry.size == 100
+    assert cache.get('missing') is None
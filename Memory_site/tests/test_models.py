@@ -0,0 +1,22 @@
+from bson.objectid import ObjectId
+from app import models
+
+
+def test_cached_users_expire_after_the_ttl(app, db, monkeypatch):
+    user_id = db.users.insert_one({'username': 'sam', 'role': 'admin'}).inserted_id
+    clock = [1000.0]
+    monkeypatch.setattr(models.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(models, '_users', models.OrderedDict())
+
+    assert models.load_user(str(user_id)).role == 'admin'
+    # Changed by another worker, which can't reach this process's cache
+    db.users.update_one({'_id': user_id}, {'$set': {'role': 'viewer'}})
+    assert models.load_user(str(user_id)).role == 'admin'
+
+    clock[0] += app.config['USER_CACHE_TTL'] + 0.1
+    assert models.load_user(str(user_id)).role == 'viewer'
+
+
+def test_unknown_and_invalid_ids_load_no_user(app, db):
+    assert models.load_user(str(ObjectId())) is None
+    assert models.load_user('not-an-id') is None
@@ -0,0 +1,69 @@
+import pytest
+from app.services import pipeline
+from app.services.ai_summarizer import SUMMARY_FAILED
+from app.services.storage import LocalStorage
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    """Records every batch sent for summarization; texts containing 'broken' fail."""
+    batches = []
+
+    def fake_summarize(texts, db, batch_size=None, summary_mode=None):
+        batches.append(list(texts))
+        return [SUMMARY_FAILED if 'broken' in text else f"Summary of {text}" for text in texts]
+    monkeypatch.setattr(pipeline, 'summarize_texts', fake_summarize)
+    # The uploads are plain text files named like slides
+    monkeypatch.setattr(pipeline, 'extract_upload_text',
+                        lambda data, filename, token_budget=None, extract_workers=0: data.decode('utf-8'))
+    return batches
+
+
+def _process(db, tmp_path, uploads):
+    files = []
+    for key, (filename, text) in enumerate(uploads):
+        path = tmp_path / f"{key}_{filename}"
+        path.write_bytes(text.encode('utf-8'))
+        files.append((key, str(path), filename))
+    storage = LocalStorage(str(tmp_path / 'storage'))
+    outcomes = list(pipeline.process_files(files, '12.9,77.5', 'Sem 1', 'CSE', db,
+                                           upload_workers=1, storage=storage))
+    return {key: (result, error) for key, result, error in outcomes}
+
+
+def test_duplicates_are_summarized_once(app, db, tmp_path, summaries):
+    outcomes = _process(db, tmp_path, [
+        ('a.pptx', 'Photosynthesis notes'),
+        ('a copy.pptx', 'Photosynthesis notes'),
+        ('b.pptx', 'Cell division notes'),
+    ])
+
+    assert summaries == [['Photosynthesis notes', 'Cell division notes']]
+    assert all(error is None for _, error in outcomes.values())
+    assert outcomes[1][0]['duplicate_of'] == outcomes[0][0]['asset_id']
+    assert db.assets.count_documents({}) == 3
+
+
+def test_duplicates_of_stored_assets_skip_the_pipeline(app, db, tmp_path, summaries):
+    _process(db, tmp_path, [('a.pptx', 'Photosynthesis notes')])
+    summaries.clear()
+
+    outcomes = _process(db, tmp_path, [('again.pptx', 'Photosynthesis notes')])
+
+    assert summaries == []
+    assert outcomes[0][0]['duplicate_of'] is not None
+    assert db.assets.count_documents({'filename': 'again.pptx'}) == 1
+
+
+def test_failed_summaries_are_not_published(app, db, tmp_path, summaries):
+    outcomes = _process(db, tmp_path, [
+        ('bad.pptx', 'broken slides'),
+        ('bad copy.pptx', 'broken slides'),
+        ('good.pptx', 'Cell division notes'),
+    ])
+
+    assert isinstance(outcomes[0][1], pipeline.PipelineError)
+    assert isinstance(outcomes[1][1], pipeline.PipelineError)
+    assert outcomes[2][1] is None
+    assert db.assets.count_documents({}) == 1
+    assert db.storage_objects.count_documents({}) == 2
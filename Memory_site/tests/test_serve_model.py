@@ -0,0 +1,26 @@
+from app.admin import routes
+
+
+def test_unsafe_drive_ids_are_rejected_before_streaming(app, monkeypatch):
+    monkeypatch.setattr(routes, 'get_file_metadata', lambda file_id: {'size': '10', 'md5Checksum': 'abc'})
+    monkeypatch.setattr(routes, 'iter_file_chunks', lambda file_id, *args, **kwargs: iter([b'x' * 10]))
+
+    response = app.test_client().get('/admin/serve_model/not.a.safe.id')
+
+    assert response.status_code == 400
+
+
+def test_drive_models_are_streamed_and_cached(app, monkeypatch):
+    monkeypatch.setattr(routes, 'get_file_metadata', lambda file_id: {'size': '10', 'md5Checksum': 'abc'})
+    monkeypatch.setattr(routes, 'iter_file_chunks', lambda file_id, *args, **kwargs: iter([b'x' * 10]))
+    client = app.test_client()
+
+    first = client.get('/admin/serve_model/drive-id_1')
+    assert first.status_code == 200
+    assert first.data == b'x' * 10
+    first.close()
+    monkeypatch.setattr(routes, 'iter_file_chunks', None)
+    second = client.get('/admin/serve_model/drive-id_1')
+
+    assert second.status_code == 200
+    assert second.data == b'x' * 10
@@ -0,0 +1,62 @@
+from pymongo.errors import PyMongoError
+from app.services import storage as storage_module
+from app.services.storage import LocalStorage, TieredStorage, replicate_pending
+
+
+class FakeDrive:
+    """Stands in for DriveStorage: records what it was asked to upload."""
+
+    def __init__(self):
+        self.uploaded = []
+
+    def put_many(self, db, items, max_workers=None):
+        self.uploaded.extend(filename for _, filename, _ in items)
+        return [{'key': None, 'drive_id': f"new-{filename}", 'url': None} for _, filename, _ in items]
+
+
+def _tiered(tmp_path):
+    tiered = TieredStorage(LocalStorage(str(tmp_path / 'storage')), FakeDrive())
+    # Replicate only through replicate_pending in these tests
+    tiered._replicator.submit = lambda *args: None
+    return tiered
+
+
+def test_replication_checks_existing_drive_copies_in_one_batch(db, tmp_path, monkeypatch):
+    tiered = _tiered(tmp_path)
+    kept, deleted, unknown = tiered.put_many(db, [(b'kept', 'kept.pdf', 'application/pdf'),
+                                                  (b'deleted', 'deleted.pdf', 'application/pdf'),
+                                                  (b'unknown', 'unknown.pdf', 'application/pdf')])
+    for stored, drive_id in ((kept, 'drive-kept'), (deleted, 'drive-deleted'), (unknown, 'drive-unknown')):
+        db.storage_objects.update_one({'_id': stored['key']}, {'$set': {'drive_id': drive_id}})
+    lookups = []
+
+    def fake_metadata(file_ids, fields=None):
+        lookups.append(sorted(file_ids))
+        # Deleted on Drive; the third lookup failed
+        return {'drive-kept': {'id': 'drive-kept'}, 'drive-deleted': None}
+    monkeypatch.setattr(storage_module, 'get_files_metadata', fake_metadata)
+
+    copied, failed = replicate_pending(db, tiered)
+
+    assert lookups == [['drive-deleted', 'drive-kept', 'drive-unknown']]
+    assert (copied, failed) == (2, 1)
+    assert tiered.drive.uploaded == ['deleted.pdf']
+    assert db.storage_objects.find_one({'_id': deleted['key']})['replicated'] is True
+    assert db.storage_objects.find_one({'_id': unknown['key']})['replicated'] is False
+
+
+def test_local_put_failures_are_per_file(db, tmp_path, monkeypatch):
+    local = LocalStorage(str(tmp_path / 'storage'))
+    original = storage_module._record
+
+    def flaky_record(db, key, filename, *args, **kwargs):
+        if filename == 'b.pdf':
+            raise PyMongoError('write concern timeout')
+        return original(db, key, filename, *args, **kwargs)
+    monkeypatch.setattr(storage_module, '_record', flaky_record)
+
+    results = local.put_many(db, [(b'a', 'a.pdf', 'application/pdf'), (b'b', 'b.pdf', 'application/pdf'),
+                                  (str(tmp_path / 'missing.pdf'), 'c.pdf', 'application/pdf')])
+
+    assert results[0]['key'] and results[1:] == [None, None]
+    assert db.storage_objects.count_documents({}) == 1
@@ -0,0 +1,78 @@
+import pytest
+from app.services import ai_summarizer
+
+
+class WordTokenizer:
+    """One token per word, enough to exercise the chunking without a model."""
+
+    def __call__(self, texts, add_special_tokens=True, **kwargs):
+        if isinstance(texts, str):
+            return {'input_ids': list(range(len(texts.split())))}
+        return {'input_ids': [list(range(len(text.split()))) for text in texts]}
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    monkeypatch.setattr(ai_summarizer, 'tokenizer', WordTokenizer())
+
+
+def _document(sentences):
+    return ' '.join(f"Sentence number {i} talks about topic {i * 7} in some detail." for i in sentences)
+
+
+def test_chunks_respect_the_window(tokenizer):
+    chunks = ai_summarizer.split_into_chunks(_document(range(300)), chunk_tokens=100, overlap_tokens=20)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.split()) <= 100 for chunk in chunks)
+    assert chunks[0].startswith('Sentence number 0 ')
+    assert chunks[-1].endswith('topic 2093 in some detail.')
+
+
+def test_long_sentences_are_split_on_words(tokenizer):
+    chunks = ai_summarizer.split_into_chunks(' '.join(['word'] * 500) + '.', chunk_tokens=100, overlap_tokens=20)
+
+    assert all(len(chunk.split()) <= 100 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) >= 500
+
+
+def test_an_edit_only_changes_nearby_chunks(tokenizer):
+    before = ai_summarizer.split_into_chunks(_document(range(300)), chunk_tokens=100, overlap_tokens=20)
+    after = ai_summarizer.split_into_chunks(_document(range(299)) + ' A new closing line.',
+                                            chunk_tokens=100, overlap_tokens=20)
+
+    unchanged = set(before) & set(after)
+    assert len(unchanged) >= len(before) - 2
+
+
+def test_chunk_summaries_are_reused(tokenizer, monkeypatch):
+    calls = []
+
+    def fake_summarize(texts, max_batch_size=None):
+        calls.append(len(texts))
+        return [' '.join(text.split()[:3]) for text in texts]
+    monkeypatch.setattr(ai_summarizer, 'summarize_texts_with_bart', fake_summarize)
+    cache = ai_summarizer.LRUChunkCache()
+    text = _document(range(300))
+
+    first = ai_summarizer.summarize_long_texts([text], chunk_cache=cache, chunk_tokens=100, overlap_tokens=20)
+    chunk_calls = calls[0]
+    calls.clear()
+    second = ai_summarizer.summarize_long_texts([text], chunk_cache=cache, chunk_tokens=100, overlap_tokens=20)
+
+    assert first == second
+    assert chunk_calls > 1
+    # Only the final reduce of the (short) joined summaries runs again
+    assert calls == [1]
+
+
+def test_failed_chunk_summaries_are_not_cached(tokenizer, monkeypatch):
+    monkeypatch.setattr(ai_summarizer, 'summarize_texts_with_bart',
+                        lambda texts, max_batch_size=None: [ai_summarizer.SUMMARY_FAILED] * len(texts))
+    cache = ai_summarizer.LRUChunkCache()
+
+    summaries = ai_summarizer.summarize_long_texts([_document(range(300))], chunk_cache=cache,
+                                                   chunk_tokens=100, overlap_tokens=20)
+
+    assert ai_summarizer.is_summary_error(summaries[0])
+    assert not cache._entries